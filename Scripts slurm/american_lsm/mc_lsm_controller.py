@@ -0,0 +1,115 @@
+import numpy as np
+import json
+import uuid
+from mc_launcher import launch_workers
+from mc_models import MODELS, MULTI_ASSET_MODELS
+from mc_statistics import parse_block_stats, std_error
+
+'''Controller computer script for pricing American and Bermudan options with the
+Longstaff-Schwartz least-squares Monte Carlo method. Regression coefficients are
+estimated backwards from a pilot run, one exercise date per SLURM job, by reducing
+the workers' normal-equation matrices. The workers keep their pilot paths and
+exercise state in node-local scratch between the jobs, so every job only advances
+it by one date. An independent pricing run then applies the broadcast coefficients
+on every worker. This script should be ran in the /home directory of the SLURM
+controller computer.'''
+
+BLOCK_SIZE = 100_000
+
+def reduce_normal_equations(output, degree):
+	'''Sums the per-block normal equations of a regress run in block order and solves
+	them for the regression coefficients.
+
+	output: str, stdout of the SLURM job
+	degree: int, degree of the regression polynomial'''
+	size = degree + 1
+	blocks = []
+	for line in output.strip().splitlines():
+		values = line.split()
+		blocks.append((int(values[0]), np.array(values[1:], dtype=float)))
+	blocks.sort(key=lambda block: block[0])
+	total = np.sum([values for block_index, values in blocks], axis=0)
+	A = total[:size * size].reshape(size, size)
+	b = total[size * size:]
+	return np.linalg.lstsq(A, b, rcond=None)[0]
+
+def mc_lsm_controller(S, K, r, sigma, q, T, N, option, pilot_simulations, total_simulations, workers, degree=3, model="gbm", model_params=None, seed=None, block_size=BLOCK_SIZE, backend="srun"):
+	'''Controller computer function for pricing a Bermudan option exercisable at N
+	equally spaced dates, or an American option as N grows, using least-squares Monte
+	Carlo. Returns a dict with the price, its standard error and the coefficients.
+
+	S: float, initial stock price
+	K: float, strike price
+	r: float, risk-free interest rate
+	sigma: float, volatility
+	q: float, dividend yield
+	T: float, time to maturity
+	N: int, number of exercise dates
+	option: str, put or call
+	pilot_simulations: int, number of pilot simulations for the regressions
+	total_simulations: int, number of independent simulations for the price
+	workers: int, number of workers to employ
+	degree: int, degree of the regression polynomial in S/K
+	model: str, name of a single-asset model in mc_models.MODELS
+	model_params: dict, extra model parameters, e.g. the GARCH parameters
+	seed: int, root seed of the random number streams, drawn from the OS if None
+	block_size: int, number of simulations per block
+	backend: str, srun or local, see mc_launcher.launch_workers'''
+	if option not in ("put", "call"):
+		raise ValueError(f"Unknown option {option}, expected put or call.")
+	if model not in MODELS or model in MULTI_ASSET_MODELS:
+		raise ValueError(f"Unknown or multi-asset model {model}, expected one of {sorted(set(MODELS) - MULTI_ASSET_MODELS)}.")
+	if seed is None:
+		seed = np.random.SeedSequence().entropy
+	params = dict(model_params or {}, S=S, K=K, r=r, sigma=sigma, q=q, T=T, option=option)
+	coefficients = [None] * N
+	job = {
+		"model": model,
+		"params": params,
+		"N": N,
+		"assets": 1,
+		"degree": degree,
+		"block_size": block_size,
+		"workers": workers,
+		"seed": seed,
+		"pool_offset": 0,
+		"precision": "float64",
+		# Names the pilot state files of this run in node-local scratch
+		"run_id": uuid.uuid4().hex,
+	}
+	# Backward induction over the exercise dates on the pilot paths (stream 0)
+	for step in range(N - 2, -1, -1):
+		regress_job = dict(job, mode="regress", step=step, stream=0, total_simulations=pilot_simulations, coefficients=coefficients)
+		output = launch_workers("mc_lsm_worker.py", [json.dumps(regress_job, separators=(",", ":"))], workers, backend)
+		coefficients[step] = reduce_normal_equations(output, degree).tolist()
+	# Independent pricing run with the broadcast coefficients (stream 1)
+	price_job = dict(job, mode="price", stream=1, total_simulations=total_simulations, coefficients=coefficients)
+	output = launch_workers("mc_lsm_worker.py", [json.dumps(price_job, separators=(",", ":"))], workers, backend)
+	stats = parse_block_stats(output)
+	n, mean, M2 = stats
+	# Exercise immediately if that is worth more
+	immediate = max(K - S, 0) if option == "put" else max(S - K, 0)
+	return {
+		"n": n,
+		"price": max(float(mean), immediate),
+		"std_error": float(std_error(stats)),
+		"coefficients": coefficients,
+	}
+
+if __name__ == "__main__":
+	# Example usage, the American put of Longstaff and Schwartz (2001)
+	S = 36
+	K = 40
+	r = 0.06
+	sigma = 0.2
+	q = 0
+	T = 1
+	N = 50
+	option = "put"
+	pilot_simulations = 100_000
+	total_simulations = 1_000_000
+	workers = 1
+	result = mc_lsm_controller(S, K, r, sigma, q, T, N, option, pilot_simulations, total_simulations, workers)
+	print(f"Workers = {workers}")
+	print(f"Total Simulations = {total_simulations}")
+	print(f"Price = {result['price']} +/- {result['std_error']}")
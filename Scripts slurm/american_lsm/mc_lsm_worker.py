@@ -0,0 +1,163 @@
+import numpy as np
+import json
+import os
+import sys
+from mc_generic_worker import block_normals
+from mc_models import MODELS
+from mc_statistics import worker_blocks, block_stats, format_block_stats
+
+'''Worker computer script for pricing American and Bermudan options with the
+Longstaff-Schwartz least-squares Monte Carlo method. In regress mode the worker
+returns the normal-equation matrices of one exercise date for its pilot paths, in
+price mode it applies the broadcast regression coefficients to independent paths.
+Paths never leave the worker. Between backward steps the pilot paths and the first
+exercise of every path are kept in node-local scratch, like the normal pool, so a
+step only applies the newest coefficients at one date. This script should be
+located in the /home directory of all SLURM worker computers, next to the generic
+worker and its modules.'''
+
+def exercise_values(paths, params):
+	'''Returns the immediate exercise values of every path at every exercise date.
+
+	paths: np.ndarray, asset prices of shape (paths, N)
+	params: dict, K strike price and option, put or call'''
+	if params["option"] == "put":
+		return np.maximum(params["K"] - paths, 0)
+	return np.maximum(paths - params["K"], 0)
+
+def regression_basis(S, K, degree):
+	'''Returns the polynomial regression basis in S/K with shape (paths, degree + 1).
+
+	S: np.ndarray, asset prices at one exercise date
+	K: float, strike price
+	degree: int, degree of the polynomial'''
+	return np.vander(S / K, degree + 1, increasing=True)
+
+def first_exercise(paths, exercise, coefficients, start, K, degree):
+	'''Applies the exercise rule from exercise date start onwards. Returns the index
+	of the first exercise date of each path, or -1 if it is never exercised, and the
+	exercise value received.
+
+	paths: np.ndarray, asset prices of shape (paths, N)
+	exercise: np.ndarray, exercise values of shape (paths, N)
+	coefficients: list, regression coefficients per exercise date, the last date is unused
+	start: int, first exercise date to consider
+	K: float, strike price
+	degree: int, degree of the regression polynomial'''
+	count, N = paths.shape
+	exercise_date = np.full(count, -1)
+	cashflow = np.zeros(count)
+	for k in range(start, N):
+		open_paths = exercise_date == -1
+		if k == N - 1:
+			exercise_now = open_paths & (exercise[:, k] > 0)
+		else:
+			continuation = regression_basis(paths[:, k], K, degree) @ np.asarray(coefficients[k])
+			exercise_now = open_paths & (exercise[:, k] > 0) & (exercise[:, k] >= continuation)
+		exercise_date[exercise_now] = k
+		cashflow[exercise_now] = exercise[exercise_now, k]
+	return exercise_date, cashflow
+
+def pilot_state_paths(job, block_index):
+	'''Returns the node-local files holding the transposed pilot paths of a block and
+	its exercise state between backward steps.
+
+	job: dict, job description built by mc_lsm_controller
+	block_index: int, global index of the block'''
+	scratch_dir = os.environ.get("SLURM_TMPDIR") or os.environ.get("TMPDIR") or "/tmp"
+	prefix = os.path.join(scratch_dir, f"lsm_{job['run_id']}_{block_index}")
+	return f"{prefix}_paths.npy", f"{prefix}_state.npz"
+
+def pilot_state(job, block_index, start, count):
+	'''Returns the pilot paths of a block transposed to shape (N, paths), and the index
+	and value of the first exercise of every path from exercise date job["step"] + 1
+	onwards. The state saved by the previous backward step is advanced by one date,
+	a block without saved state on this node is simulated and replayed instead.
+
+	job: dict, job description built by mc_lsm_controller in regress mode
+	block_index, start, count: int, block from mc_statistics.worker_blocks'''
+	params = job["params"]
+	step = job["step"]
+	paths_file, state_file = pilot_state_paths(job, block_index)
+	if step < job["N"] - 2 and os.path.exists(state_file):
+		with np.load(state_file) as state:
+			saved_step = int(state["step"])
+			exercise_date = state["exercise_date"]
+			cashflow = state["cashflow"]
+		if saved_step == step + 1:
+			paths = np.load(paths_file, mmap_mode="r")
+			# Apply the coefficients of date step + 1, exercising there replaces any later exercise
+			S = np.asarray(paths[step + 1])
+			exercise = exercise_values(S, params)
+			continuation = regression_basis(S, params["K"], job["degree"]) @ np.asarray(job["coefficients"][step + 1])
+			exercise_now = (exercise > 0) & (exercise >= continuation)
+			return paths, np.where(exercise_now, step + 1, exercise_date), np.where(exercise_now, exercise, cashflow)
+	paths = MODELS[job["model"]](params, block_normals(job, block_index, start, count))
+	exercise_date, cashflow = first_exercise(paths, exercise_values(paths, params), job["coefficients"], step + 1, params["K"], job["degree"])
+	# Dates as rows, so a step reads one contiguous row per date
+	tmp_path = f"{paths_file}.{os.getpid()}.tmp.npy"
+	np.save(tmp_path, np.ascontiguousarray(paths.T))
+	os.replace(tmp_path, paths_file)
+	return paths.T, exercise_date, cashflow
+
+def save_pilot_state(job, block_index, exercise_date, cashflow):
+	'''Saves the exercise state of a block after a backward step, or removes the
+	block's scratch files after the last step.
+
+	job: dict, job description built by mc_lsm_controller in regress mode
+	block_index: int, global index of the block
+	exercise_date, cashflow: np.ndarray, first exercise of every path from job["step"] + 1'''
+	paths_file, state_file = pilot_state_paths(job, block_index)
+	if job["step"] == 0:
+		for path in (paths_file, state_file):
+			if os.path.exists(path):
+				os.remove(path)
+		return
+	tmp_path = f"{state_file}.{os.getpid()}.tmp.npz"
+	np.savez(tmp_path, step=job["step"], exercise_date=exercise_date, cashflow=cashflow)
+	os.replace(tmp_path, state_file)
+
+def mc_lsm_worker(job, worker_id):
+	'''Worker computer function for least-squares Monte Carlo. In regress mode returns a
+	list of (block_index, A, b) with the normal equations X'X and X'Y of exercise date
+	job["step"] for the in-the-money pilot paths. In price mode returns a list of
+	(block_index, (n, mean, M2)) of the discounted cashflows under the exercise rule.
+
+	job: dict, job description built by mc_lsm_controller
+	worker_id: int, index of this worker within the SLURM job'''
+	params = job["params"]
+	N = job["N"]
+	degree = job["degree"]
+	dt = params["T"] / N
+	model = MODELS[job["model"]]
+	results = []
+	for block_index, start, count in worker_blocks(job["total_simulations"], job["block_size"], job["workers"], worker_id):
+		if job["mode"] == "regress":
+			step = job["step"]
+			paths, exercise_date, cashflow = pilot_state(job, block_index, start, count)
+			# Discount the realised cashflows back to the regression date
+			Y = cashflow * np.exp(-params["r"] * (exercise_date - step) * dt)
+			S = np.asarray(paths[step])
+			in_the_money = exercise_values(S, params) > 0
+			X = regression_basis(S[in_the_money], params["K"], degree)
+			results.append((block_index, X.T @ X, X.T @ Y[in_the_money]))
+			save_pilot_state(job, block_index, exercise_date, cashflow)
+		else:
+			paths = model(params, block_normals(job, block_index, start, count))
+			exercise = exercise_values(paths, params)
+			exercise_date, cashflow = first_exercise(paths, exercise, job["coefficients"], 0, params["K"], degree)
+			values = cashflow * np.exp(-params["r"] * (exercise_date + 1) * dt)
+			results.append((block_index, block_stats(values)))
+	return results
+
+if __name__ == "__main__":
+	# Collect the JSON job description from SLURM job command
+	job = json.loads(sys.argv[1])
+	worker_id = int(os.environ.get("SLURM_PROCID", 0))
+	# Return per-block normal equations or statistics to controller computer
+	for result in mc_lsm_worker(job, worker_id):
+		if job["mode"] == "regress":
+			block_index, A, b = result
+			print(" ".join([str(block_index)] + [repr(float(value)) for value in np.concatenate([A.ravel(), b])]))
+		else:
+			print(format_block_stats(*result))
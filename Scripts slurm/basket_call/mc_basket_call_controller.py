@@ -0,0 +1,40 @@
+from mc_generic_controller import mc_generic_controller
+
+'''Controller computer script for pricing a call option on a basket of correlated
+assets using Monte Carlo simulation. Paths are simulated by the generic worker,
+mc_generic_worker.py, with the multi_gbm model. This script should be ran in the
+/home directory of the SLURM controller computer.'''
+
+def mc_basket_call_controller(S, K, r, sigma, q, T, correlation, weights, total_simulations, workers):
+	'''Controller computer function for pricing a basket call option using Monte Carlo
+	simulation.
+
+	S: list, initial stock prices
+	K: float, strike price
+	r: float, risk-free interest rate
+	sigma: list, volatilities
+	q: list, dividend yields
+	T: float, time to maturity
+	correlation: list, correlation matrix of the asset returns
+	weights: list, basket weights
+	total_simulations: int, total number of simulations
+	workers: int, number of workers to employ'''
+	params = {"S": S, "K": K, "r": r, "sigma": sigma, "q": q, "T": T, "correlation": correlation, "weights": weights}
+	return mc_generic_controller("multi_gbm", "basket_call", params, 1, total_simulations, workers)["price"]
+
+if __name__ == "__main__":
+	# Example usage
+	S = [100, 95, 110]
+	K = 100
+	r = 0.05
+	sigma = [0.2, 0.25, 0.3]
+	q = [0.01, 0.02, 0.0]
+	T = 1
+	correlation = [[1, 0.5, 0.3], [0.5, 1, 0.4], [0.3, 0.4, 1]]
+	weights = [0.4, 0.3, 0.3]
+	total_simulations = 1_000_000
+	workers = 1
+	price = mc_basket_call_controller(S, K, r, sigma, q, T, correlation, weights, total_simulations, workers)
+	print(f"Workers = {workers}")
+	print(f"Total Simulations = {total_simulations}")
+	print(f"Price = {price}")
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+'''Stand-in for sbatch that runs the array tasks of a batch script one after another
+on this computer, for testing the batch controller without a SLURM cluster. Tasks
+listed in the FAKE_SBATCH_FAIL environment variable, e.g. 2,5, are skipped to
+simulate failed nodes. Usage: python3 fake_sbatch.py --parsable --array=0-3 job.sh'''
+
+def parse_array(spec):
+	'''Expands a SLURM --array specification such as 0-3,7 into task indices.
+
+	spec: str, comma separated indices and inclusive ranges'''
+	task_ids = []
+	for part in spec.split(","):
+		if "-" in part:
+			first, last = part.split("-")
+			task_ids.extend(range(int(first), int(last) + 1))
+		else:
+			task_ids.append(int(part))
+	return task_ids
+
+if __name__ == "__main__":
+	array = "0"
+	script = None
+	for arg in sys.argv[1:]:
+		if arg.startswith("--array="):
+			array = arg.split("=", 1)[1]
+		elif not arg.startswith("--"):
+			script = arg
+	failing = parse_array(os.environ["FAKE_SBATCH_FAIL"]) if os.environ.get("FAKE_SBATCH_FAIL") else []
+	job_id = str(os.getpid())
+	for task_id in parse_array(array):
+		if task_id in failing:
+			continue
+		env = dict(os.environ, SLURM_ARRAY_JOB_ID=job_id, SLURM_ARRAY_TASK_ID=str(task_id))
+		subprocess.run(["bash", script], env=env, stdout=subprocess.DEVNULL, check=False)
+	print(job_id)
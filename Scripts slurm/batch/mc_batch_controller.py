@@ -0,0 +1,125 @@
+import json
+import os
+import shlex
+import subprocess
+import sys
+from mc_batch_task import task_result_path
+from mc_generic_controller import BLOCK_SIZE, build_generic_job, generic_result
+from mc_statistics import parse_block_stats
+
+'''Controller computer script for submitting Monte Carlo pricing jobs as SLURM job
+arrays with sbatch. The job spec and the results of every array task live in a
+shared result directory, so the controller can disconnect, merge whatever has
+finished so far and resubmit only the tasks that failed. This script should be
+ran in the /home directory of the SLURM controller computer.'''
+
+BATCH_SCRIPT = """#!/bin/bash
+#SBATCH --job-name=mc_{payoff}
+#SBATCH --chdir={workdir}
+#SBATCH --output={output}
+python3 mc_batch_task.py {result_dir}
+"""
+
+def submit_batch_array(result_dir, task_ids, sbatch=("sbatch",)):
+	'''Submits array tasks of a prepared batch job. Returns the SLURM job id.
+
+	result_dir: str, shared result directory holding job.json and job.sh
+	task_ids: list, array task indices to run
+	sbatch: tuple, command used to submit, e.g. a fake sbatch shim for local testing'''
+	array = ",".join(str(task_id) for task_id in task_ids)
+	command_list = list(sbatch) + ["--parsable", f"--array={array}", os.path.join(result_dir, "job.sh")]
+	result = subprocess.run(command_list, capture_output=True, text=True, check=True)
+	return result.stdout.strip().split(";")[0]
+
+def mc_batch_submit(model, payoff, params, N, total_simulations, tasks, result_dir, seed=None, precision="float64", block_size=BLOCK_SIZE, sbatch=("sbatch",)):
+	'''Writes the job spec and batch script to the result directory and submits
+	the job as a SLURM array. Returns the SLURM job id.
+
+	model: str, name of a model in mc_models.MODELS
+	payoff: str, name of a payoff in mc_payoffs.PAYOFFS
+	params: dict, model and payoff parameters, r and T are used for discounting
+	N: int, number of monitoring points
+	total_simulations: int, total number of simulations
+	tasks: int, number of array tasks to split the blocks across
+	result_dir: str, result directory on storage shared by all nodes, must be new or empty
+	seed: int, root seed of the random number streams, drawn from the OS if None
+	precision: str, float64 or float32 path arithmetic
+	block_size: int, number of simulations per block
+	sbatch: tuple, command used to submit, e.g. a fake sbatch shim for local testing'''
+	job = build_generic_job(model, payoff, params, N, total_simulations, tasks, seed, precision=precision, block_size=block_size)
+	os.makedirs(result_dir, exist_ok=True)
+	if os.listdir(result_dir):
+		raise ValueError(f"Result directory {result_dir} is not empty.")
+	result_dir = os.path.abspath(result_dir)
+	with open(os.path.join(result_dir, "job.json"), "w") as job_file:
+		json.dump(job, job_file)
+	with open(os.path.join(result_dir, "job.sh"), "w") as script_file:
+		# Quoted, so directories with spaces such as "Scripts slurm" stay one argument
+		script_file.write(BATCH_SCRIPT.format(payoff=payoff, workdir=shlex.quote(os.getcwd()),
+			output=shlex.quote(os.path.join(result_dir, "slurm-%A_%a.out")), result_dir=shlex.quote(result_dir)))
+	return submit_batch_array(result_dir, range(tasks), sbatch)
+
+def collect_batch_results(result_dir):
+	'''Merges the results of every array task that has finished. Returns the pricing
+	result of mc_generic_controller for the finished paths, with the finished and
+	missing task indices added.
+
+	result_dir: str, shared result directory of the batch job'''
+	with open(os.path.join(result_dir, "job.json")) as job_file:
+		job = json.load(job_file)
+	finished = []
+	missing = []
+	output = ""
+	for task_id in range(job["workers"]):
+		path = task_result_path(result_dir, task_id)
+		if os.path.exists(path):
+			finished.append(task_id)
+			with open(path) as result_file:
+				output += result_file.read()
+		else:
+			missing.append(task_id)
+	if not finished:
+		raise ValueError(f"No array task of {result_dir} has finished yet.")
+	result = generic_result(job, parse_block_stats(output))
+	result["finished_tasks"] = finished
+	result["missing_tasks"] = missing
+	return result
+
+def resubmit_missing_tasks(result_dir, sbatch=("sbatch",)):
+	'''Resubmits only the array tasks without a result file. Returns the SLURM job id,
+	or None if every task has finished. Tasks that are still running are resubmitted
+	too, their duplicate skips the work if the original finishes first.
+
+	result_dir: str, shared result directory of the batch job
+	sbatch: tuple, command used to submit, e.g. a fake sbatch shim for local testing'''
+	with open(os.path.join(result_dir, "job.json")) as job_file:
+		job = json.load(job_file)
+	missing = [task_id for task_id in range(job["workers"]) if not os.path.exists(task_result_path(result_dir, task_id))]
+	if not missing:
+		return None
+	return submit_batch_array(result_dir, missing, sbatch)
+
+if __name__ == "__main__":
+	# Example usage, sbatch returns at once, so submit first and collect later, possibly
+	# from a new session: python3 mc_batch_controller.py submit|collect|resubmit
+	model = "gbm"
+	payoff = "vanilla_call"
+	params = {"S": 90, "K": 100, "r": 0.05, "sigma": 0.2, "q": 0.01, "T": 1}
+	N = 1
+	total_simulations = 100_000_000
+	tasks = 16
+	result_dir = "/home/mc_results/euro_call_otm"
+	step = sys.argv[1] if len(sys.argv) > 1 else "submit"
+	if step == "submit":
+		job_id = mc_batch_submit(model, payoff, params, N, total_simulations, tasks, result_dir)
+		print(f"Submitted batch job {job_id}, collect with: python3 mc_batch_controller.py collect")
+	elif step == "collect":
+		result = collect_batch_results(result_dir)
+		print(f"Finished tasks = {len(result['finished_tasks'])}/{tasks}")
+		print(f"Total Simulations = {result['n']}")
+		print(f"Price = {result['price']} +/- {result['std_error']}")
+	elif step == "resubmit":
+		job_id = resubmit_missing_tasks(result_dir)
+		print("Every task has finished." if job_id is None else f"Resubmitted missing tasks as batch job {job_id}")
+	else:
+		raise ValueError(f"Unknown step {step}, expected submit, collect or resubmit.")
@@ -0,0 +1,46 @@
+import json
+import os
+import socket
+import sys
+from mc_generic_worker import mc_generic_worker
+from mc_statistics import format_block_stats
+
+'''SLURM array task script for batch Monte Carlo jobs. Each array task runs its share
+of the generic worker's blocks and writes the per-block statistics to the shared
+result directory with an atomic rename, so the collector only ever sees complete
+result files. This script should be located in the /home directory of all SLURM
+worker computers, next to the generic worker and its modules.'''
+
+def task_result_path(result_dir, task_id):
+	'''Returns the location of an array task's result file.
+
+	result_dir: str, shared result directory of the batch job
+	task_id: int, SLURM array task index'''
+	return os.path.join(result_dir, f"task_{task_id}.txt")
+
+def mc_batch_task(result_dir, task_id):
+	'''Runs one array task of a batch job and writes its result file. Tasks whose
+	result file already exists are skipped, so resubmitting a task is harmless.
+
+	result_dir: str, shared result directory holding job.json
+	task_id: int, SLURM array task index'''
+	path = task_result_path(result_dir, task_id)
+	if os.path.exists(path):
+		return path
+	with open(os.path.join(result_dir, "job.json")) as job_file:
+		job = json.load(job_file)
+	lines = [format_block_stats(block_index, stats) for block_index, stats in mc_generic_worker(job, task_id)]
+	# Host and PID, as a resubmitted copy of the task may run on another node with the same PID
+	tmp_path = f"{path}.{socket.gethostname()}.{os.getpid()}.tmp"
+	with open(tmp_path, "w") as result_file:
+		result_file.write("\n".join(lines) + "\n")
+		result_file.flush()
+		os.fsync(result_file.fileno())
+	os.replace(tmp_path, path)
+	return path
+
+if __name__ == "__main__":
+	# Collect the result directory from the batch script and the task index from SLURM
+	result_dir = sys.argv[1]
+	task_id = int(os.environ["SLURM_ARRAY_TASK_ID"])
+	print(mc_batch_task(result_dir, task_id))
@@ -1,10 +1,100 @@
+import math
 import numpy as np
-from scipy.stats import norm
+
+# Rational approximations of erf and erfc from the Cephes ndtr, highest degree first
+ERF_T = [9.60497373987051638749e0, 9.00260197203842689217e1, 2.23200534594684319226e3, 7.00332514112805075473e3, 5.55923013010394962768e4]
+ERF_U = [1.0, 3.35617141647503099647e1, 5.21357949780152679795e2, 4.59432382970980127987e3, 2.26290000613890934246e4, 4.92673942608635921086e4]
+ERFC_P = [2.46196981473530512524e-10, 5.64189564831068821977e-1, 7.46321056442269912687e0, 4.86371970985681366614e1,
+    1.96520832956077098242e2, 5.26445194995477358631e2, 9.34528527171957607540e2, 1.02755188689515710272e3, 5.57535335369399327526e2]
+ERFC_Q = [1.0, 1.32281951154744992508e1, 8.67072140885989742329e1, 3.54937778887819891062e2, 9.75708501743205489753e2,
+    1.82390916687909736289e3, 2.24633760818710981792e3, 1.65666309194161350182e3, 5.57535340817727675546e2]
+ERFC_R = [5.64189583547755073984e-1, 1.27536670759978104416e0, 5.01905042251180477414e0, 6.16021097993053585195e0,
+    7.40974269950448939160e0, 2.97886665372100240670e0]
+ERFC_S = [1.0, 2.26052863220117276590e0, 9.39603524938001434673e0, 1.20489539808096656605e1, 1.70814450747565897222e1,
+    9.60896809063285878198e0, 3.36907645100081516050e0]
+
+def norm_cdf(x):
+    '''Standard normal cumulative distribution function, a drop-in for
+    scipy.stats.norm.cdf without SciPy. Scalars use math.erfc, arrays the vectorized
+    Cephes approximations of erf near zero and of erfc in the tails, accurate to
+    about 1e-15 relative error.
+
+    x: float or np.ndarray, points to evaluate'''
+    if np.ndim(x) == 0:
+        return 0.5 * math.erfc(-float(x) / math.sqrt(2))
+    t = np.asarray(x, dtype=float) / math.sqrt(2)
+    z = np.abs(t)
+    # Below |t| = 1, 0.5 + 0.5 erf(t) keeps full precision
+    c = np.clip(t, -1.0, 1.0)
+    central = 0.5 + 0.5 * c * np.polyval(ERF_T, c * c) / np.polyval(ERF_U, c * c)
+    # In the tails 0.5 erfc(|t|) avoids the cancellation of 1 - erf, |t| is clipped so the polynomials stay finite
+    a = np.clip(z, 1.0, 30.0)
+    ratio = np.where(a < 8, np.polyval(ERFC_P, a) / np.polyval(ERFC_Q, a), np.polyval(ERFC_R, a) / np.polyval(ERFC_S, a))
+    # exp(-a * a) with a split into a multiple of 1/16, whose square is exact, and a remainder
+    high = np.round(a * 16) / 16
+    low = a - high
+    tail = 0.5 * np.exp(-high * high) * np.exp(-(2 * high + low) * low) * ratio
+    return np.where(z < 1, central, np.where(t > 0, 1 - tail, tail))
 
 def black_scholes_euro_call(S, K, r, sigma, q, T):
     d1 = (np.log(S/K) + (r - q + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
     d2 = d1 - sigma * np.sqrt(T)
-    call_value = S * np.exp(-q * T) * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2)
+    call_value = S * np.exp(-q * T) * norm_cdf(d1) - K * np.exp(-r * T) * norm_cdf(d2)
+    return call_value
+
+def black_scholes_vega(S, K, r, sigma, q, T):
+    '''Sensitivity of the Black-Scholes call price to the volatility.
+
+    Arguments are as for black_scholes_euro_call.'''
+    d1 = (np.log(S/K) + (r - q + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
+    return S * np.exp(-q * T) * np.sqrt(T) * np.exp(-0.5 * d1 * d1) / np.sqrt(2 * np.pi)
+
+def implied_volatility(price, S, K, r, q, T, tol=1e-10, max_iterations=100, max_sigma=5.0):
+    '''Inverts black_scholes_euro_call for the volatility of every call price of a chain
+    at once. Newton steps are kept inside a bisection bracket, so every quote converges
+    even where vega is small. Returns NaN for prices outside the no-arbitrage bounds.
+
+    price: float or np.ndarray, call prices
+    S, K, r, q, T: float or np.ndarray, broadcast against price
+    tol: float, tolerance on the price error
+    max_iterations: int, number of Newton or bisection steps
+    max_sigma: float, upper end of the initial bracket'''
+    price, S, K, r, q, T = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (price, S, K, r, q, T)))
+    lower_bound = np.maximum(S * np.exp(-q * T) - K * np.exp(-r * T), 0)
+    upper_bound = S * np.exp(-q * T)
+    valid = (price > lower_bound) & (price < upper_bound)
+    low = np.full(price.shape, 1e-8)
+    high = np.full(price.shape, max_sigma)
+    # Brenner-Subrahmanyam at-the-money approximation as the starting point
+    sigma = np.clip(np.sqrt(2 * np.pi / T) * price / S, 0.01, max_sigma / 2)
+    for _ in range(max_iterations):
+        error = black_scholes_euro_call(S, K, r, sigma, q, T) - price
+        if np.all(np.abs(error[valid]) < tol):
+            break
+        high = np.where(error > 0, sigma, high)
+        low = np.where(error > 0, low, sigma)
+        vega = black_scholes_vega(S, K, r, sigma, q, T)
+        with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+            newton = sigma - error / vega
+        sigma = np.where((newton > low) & (newton < high), newton, 0.5 * (low + high))
+    return np.where(valid, sigma, np.nan)
+
+def geometric_asian_call(S, K, sigma, r, q, T, N):
+    '''Prices a geometric Asian call option using the Black-Scholes formula.
+
+    S: float, initial stock price
+    K: float, strike price
+    sigma: float, volatility
+    r: float, risk-free interest rate
+    q: float, dividend yield
+    T: float, time to maturity
+    N: int, number of monitoring points'''
+    dt = T/N
+    nu = r - q - 0.5 * sigma * sigma
+    a = N * (N + 1) * (2 * N + 1) / 6
+    V = np.exp(-r*T)*S*np.exp(((N+1)*nu/2 + sigma*sigma*a/(2*N*N))*dt)
+    sigavg = sigma * np.sqrt(a) / (N**1.5)
+    call_value = black_scholes_euro_call(V, K, r, sigavg, 0, T)
     return call_value
 
 
@@ -15,4 +105,6 @@ if __name__ == "__main__":
     sigma = 0.2
     q = 0.01
     T = 1
-    print(black_scholes_euro_call(S, K, r, sigma, q, T))
\ No newline at end of file
+    print(black_scholes_euro_call(S, K, r, sigma, q, T))
+    strikes = np.array([80, 90, 100, 110, 120])
+    print(implied_volatility(black_scholes_euro_call(S, strikes, r, sigma, q, T), S, strikes, r, q, T))
\ No newline at end of file
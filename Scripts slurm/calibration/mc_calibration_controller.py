@@ -0,0 +1,174 @@
+import numpy as np
+import json
+import os
+from black_scholes import black_scholes_euro_call, implied_volatility
+from mc_calibration_worker import sample_block_path
+from mc_generic_controller import BLOCK_SIZE, build_generic_job, validate_generic_request
+from mc_launcher import launch_workers
+from mc_models import MODEL_LOG_DENSITIES
+from mc_payoffs import CONTROL_VARIATES
+
+'''Controller computer script for calibrating Monte Carlo-only models, such as the
+GARCH parameters kappa, theta and lambda_, to quoted option prices. Reference paths
+are simulated once on the cluster from fixed common random numbers. Every optimizer
+iteration then reprices the quotes on the controller by reweighting those paths with
+the likelihood ratio of the model density, with the gradient from the score on the
+same paths, instead of launching a fresh cluster job. Black-Scholes implied
+volatilities of whole chains are inverted analytically with
+black_scholes.implied_volatility. This script should be ran in the /home directory of
+the SLURM controller computer.'''
+
+BOUNDS = {"kappa": (1e-6, 1 - 1e-6), "lambda_": (1e-6, 1 - 1e-6), "theta": (1e-8, np.inf), "sigma": (1e-6, np.inf)}
+
+def simulate_reference_sample(job, sample_dir, workers, backend="srun"):
+	'''Simulates the reference paths of a calibration on the cluster. Returns the paths,
+	shape (paths, N), and the undiscounted quote payoffs on them, shape (quotes, paths).
+
+	job: dict, job description built by mc_generic_controller with the quotes as products
+	sample_dir: str, sample directory on storage shared by all nodes
+	workers: int, number of workers to employ
+	backend: str, srun or local, see mc_launcher.launch_workers'''
+	os.makedirs(sample_dir, exist_ok=True)
+	launch_workers("mc_calibration_worker.py", [json.dumps(job, separators=(",", ":")), sample_dir], workers, backend)
+	paths = []
+	payoffs = []
+	for block_index in range(-(-job["total_simulations"] // job["block_size"])):
+		with np.load(sample_block_path(sample_dir, block_index)) as block:
+			paths.append(block["paths"])
+			payoffs.append(block["payoffs"])
+	return np.concatenate(paths), np.concatenate(payoffs, axis=1)
+
+def reweighted_prices(model, params, names, paths, payoffs, reference_log_density, discounts):
+	'''Reprices the quotes under params by reweighting the reference paths with the
+	likelihood ratio. Returns the prices, their Jacobian with respect to the named
+	parameters, shape (quotes, len(names)), and the effective sample size of the
+	weights as a fraction of the paths.
+
+	model: str, name of a model in mc_models.MODEL_LOG_DENSITIES
+	params: dict, model parameters to price under
+	names: list, names of the calibrated parameters
+	paths: np.ndarray, reference paths of shape (paths, N)
+	payoffs: np.ndarray, undiscounted quote payoffs on the reference paths
+	reference_log_density: np.ndarray, log density of the paths under the reference params
+	discounts: np.ndarray, discount factor of every quote'''
+	log_density, score = MODEL_LOG_DENSITIES[model](params, paths, names)
+	weights = np.exp(log_density - reference_log_density)
+	weighted = payoffs * weights
+	prices = discounts * weighted.mean(axis=1)
+	jacobian = discounts[:, np.newaxis] * (weighted @ score.T) / len(weights)
+	ess = weights.sum()**2 / (weights * weights).sum() / len(weights)
+	return prices, jacobian, ess
+
+def mc_calibration_controller(model, params, names, quotes, N, total_simulations, workers, sample_dir, seed=None, bounds=None, max_iterations=100, tolerance=1e-10, min_ess=0.5, block_size=BLOCK_SIZE, backend="srun"):
+	'''Fits the named model parameters to quoted prices by least squares with
+	Levenberg-Marquardt steps on reweighted reference paths. When the effective sample
+	size of the weights falls below min_ess, the reference paths are simulated again
+	under the current parameters from the same random numbers. Returns a dict with the
+	fitted params, the model and market prices, the root mean squared pricing error,
+	the number of iterations and the number of cluster jobs run.
+
+	model: str, name of a model in mc_models.MODEL_LOG_DENSITIES, e.g. garch
+	params: dict, starting model parameters, r and T are used for discounting
+	names: list, names of the parameters to fit, e.g. ["kappa", "theta", "lambda_"]
+	quotes: list, dicts with a payoff, its market price and payoff params such as K,
+		and optionally a maturity T on the monitoring grid of the params T
+	N: int, number of monitoring points up to the params T
+	total_simulations: int, number of reference paths
+	workers: int, number of workers to employ
+	sample_dir: str, sample directory on storage shared by all nodes
+	seed: int, root seed of the common random numbers, drawn from the OS if None
+	bounds: dict, (low, high) per fitted parameter, defaults to BOUNDS
+	max_iterations: int, maximum number of Levenberg-Marquardt iterations
+	tolerance: float, relative decrease of the squared error below which the fit stops
+	min_ess: float, effective sample size fraction below which paths are resimulated
+	block_size: int, number of simulations per block
+	backend: str, srun or local, see mc_launcher.launch_workers'''
+	if model not in MODEL_LOG_DENSITIES:
+		raise ValueError(f"Model {model} has no log density, expected one of {tuple(MODEL_LOG_DENSITIES)}.")
+	products = []
+	for quote in quotes:
+		quote_params = {key: value for key, value in quote.items() if key not in ("payoff", "price")}
+		validate_generic_request(model, quote["payoff"], dict(params, **quote_params))
+		if quote["payoff"] in CONTROL_VARIATES:
+			raise ValueError(f"Payoff {quote['payoff']} has a control variate and cannot be reweighted.")
+		steps = quote.get("T", params["T"]) / params["T"] * N
+		if abs(steps - round(steps)) > 1e-9 or not 1 <= round(steps) <= N:
+			raise ValueError(f"Quote maturity {quote.get('T')} is not on the monitoring grid of T = {params['T']} and N = {N}.")
+		products.append([quote["payoff"], quote_params])
+	bounds = dict(BOUNDS, **(bounds or {}))
+	low = np.array([bounds[name][0] for name in names])
+	high = np.array([bounds[name][1] for name in names])
+	market = np.array([quote["price"] for quote in quotes], dtype=float)
+	discounts = np.exp(-params["r"] * np.array([quote.get("T", params["T"]) for quote in quotes]))
+	if seed is None:
+		seed = np.random.SeedSequence().entropy
+	current = dict(params)
+	jobs = 0
+	def resimulate(current):
+		# Same seed and stream every time, so the objective stays smooth across resimulations
+		job = build_generic_job(model, None, current, N, total_simulations, workers, seed, block_size=block_size, products=products)
+		paths, payoffs = simulate_reference_sample(job, sample_dir, workers, backend)
+		reference_log_density, _ = MODEL_LOG_DENSITIES[model](current, paths, [])
+		return paths, payoffs, reference_log_density
+	sample = resimulate(current)
+	jobs += 1
+	prices, jacobian, ess = reweighted_prices(model, current, names, *sample, discounts)
+	cost = np.sum((prices - market)**2)
+	damping = 1e-3
+	iteration = 0
+	for iteration in range(1, max_iterations + 1):
+		# Levenberg-Marquardt step, projected into the parameter bounds
+		JtJ = jacobian.T @ jacobian
+		step = np.linalg.solve(JtJ + damping * np.diag(np.diag(JtJ) + 1e-12), -jacobian.T @ (prices - market))
+		values = np.clip(np.array([current[name] for name in names]) + step, low, high)
+		candidate = dict(current, **dict(zip(names, values.tolist())))
+		candidate_prices, candidate_jacobian, candidate_ess = reweighted_prices(model, candidate, names, *sample, discounts)
+		candidate_cost = np.sum((candidate_prices - market)**2)
+		if candidate_cost < cost:
+			decrease = (cost - candidate_cost) / max(cost, 1e-300)
+			current, prices, jacobian, ess, cost = candidate, candidate_prices, candidate_jacobian, candidate_ess, candidate_cost
+			damping = max(damping / 10, 1e-12)
+			if ess < min_ess:
+				# Weights have degenerated, warm-start fresh reference paths at the current fit
+				sample = resimulate(current)
+				jobs += 1
+				prices, jacobian, ess = reweighted_prices(model, current, names, *sample, discounts)
+				cost = np.sum((prices - market)**2)
+			elif decrease < tolerance:
+				break
+		else:
+			damping *= 10
+			if damping > 1e12:
+				break
+	return {
+		"params": current,
+		"prices": prices,
+		"market": market,
+		"rmse": float(np.sqrt(cost / len(market))),
+		"ess": float(ess),
+		"iterations": iteration,
+		"cluster_jobs": jobs,
+	}
+
+if __name__ == "__main__":
+	# Example usage, fit GARCH to a call chain quoted in implied volatilities
+	S = 100
+	r = 0.05
+	q = 0.01
+	T = 1
+	N = 12
+	strikes = np.array([80, 90, 100, 110, 120] * 2)
+	maturities = np.array([0.5] * 5 + [1.0] * 5)
+	market_vols = 0.2 + 0.3 * np.log(strikes / S)**2
+	market_prices = black_scholes_euro_call(S, strikes, r, market_vols, q, maturities)
+	quotes = [{"payoff": "vanilla_call", "K": float(K), "T": float(maturity), "price": float(price)} for K, maturity, price in zip(strikes, maturities, market_prices)]
+	params = {"S": S, "r": r, "q": q, "sigma": 0.2, "T": T, "kappa": 0.1, "theta": 0.04, "lambda_": 0.6}
+	names = ["kappa", "theta", "lambda_"]
+	total_simulations = 200_000
+	workers = 4
+	result = mc_calibration_controller("garch", params, names, quotes, N, total_simulations, workers, "/home/mc_calibration/garch")
+	fitted = ", ".join(f"{name} = {result['params'][name]}" for name in names)
+	print(f"Fitted {fitted}")
+	print(f"RMSE = {result['rmse']} after {result['iterations']} iterations and {result['cluster_jobs']} cluster jobs")
+	print(f"Market vols = {market_vols}")
+	print(f"Model vols = {implied_volatility(result['prices'], S, strikes, r, q, maturities)}")
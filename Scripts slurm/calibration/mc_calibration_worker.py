@@ -0,0 +1,57 @@
+import numpy as np
+import json
+import os
+import sys
+from mc_generic_worker import block_normals
+from mc_models import MODELS
+from mc_payoffs import PAYOFFS
+from mc_statistics import worker_blocks
+
+'''Worker computer script that simulates the reference paths of a calibration. Every
+block of paths is saved with the payoffs of the calibration quotes on it to a sample
+directory on storage shared by all nodes, so the controller can reprice the quotes
+under new parameters by reweighting the same paths. This script should be located
+in the /home directory of all SLURM worker computers, next to mc_generic_worker.py.'''
+
+def sample_block_path(sample_dir, block_index):
+	'''Returns the file holding one block of reference paths and quote payoffs.
+
+	sample_dir: str, shared sample directory of the calibration
+	block_index: int, global index of the block'''
+	return os.path.join(sample_dir, f"block_{block_index}.npz")
+
+def quote_payoffs(job, paths):
+	'''Returns the payoffs of every quote on a block of paths, shape (quotes, paths).
+	A quote maturing at T before the params T is priced on the monitoring points up
+	to its maturity.
+
+	job: dict, job description built by mc_generic_controller with the quotes as products
+	paths: np.ndarray, asset prices of shape (paths, N)'''
+	params = job["params"]
+	payoffs = []
+	for payoff, quote_params in job["products"]:
+		steps = round(quote_params.get("T", params["T"]) / params["T"] * job["N"])
+		payoffs.append(PAYOFFS[payoff](paths[:, :steps], dict(params, **quote_params)))
+	return np.stack(payoffs)
+
+def mc_calibration_worker(job, sample_dir, worker_id):
+	'''Simulates the blocks of reference paths of this worker and saves them with their
+	quote payoffs. Files are written atomically, so a reader never sees a partial block.
+
+	job: dict, job description built by mc_generic_controller with the quotes as products
+	sample_dir: str, shared sample directory of the calibration
+	worker_id: int, index of this worker within the SLURM job'''
+	model = MODELS[job["model"]]
+	for block_index, start, count in worker_blocks(job["total_simulations"], job["block_size"], job["workers"], worker_id):
+		paths = model(job["params"], block_normals(job, block_index, start, count))
+		path = sample_block_path(sample_dir, block_index)
+		tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+		np.savez(tmp_path, paths=paths, payoffs=quote_payoffs(job, paths))
+		os.replace(tmp_path, path)
+
+if __name__ == "__main__":
+	# Collect the JSON job description and sample directory from SLURM job command
+	job = json.loads(sys.argv[1])
+	sample_dir = sys.argv[2]
+	worker_id = int(os.environ.get("SLURM_PROCID", 0))
+	mc_calibration_worker(job, sample_dir, worker_id)
@@ -1,41 +1,118 @@
 import numpy as np
-import subprocess
+import json
+from mc_launcher import launch_workers
+from mc_statistics import combine_stats, parse_block_stats, std_error
 
-'''Controller computer script for pricing a European call option using 
-Monte Carlo simulation. This script should be ran in the /home directory 
+'''Controller computer script for pricing a European call option using
+Monte Carlo simulation. This script should be ran in the /home directory
 of the SLURM controller computer.'''
 
+BLOCK_SIZE = 100_000
+
+def euro_call_result(S, K, r, sigma, q, T, seed, next_stream, pool_size, pool_offset, stats):
+	'''Builds a pricing result from the sufficient statistics of the simulated payoffs.
+	The statistics are kept undiscounted so results can be merged with merge_euro_call_results.
+
+	S: float, initial stock price
+	K: float, strike price
+	r: float, risk-free interest rate
+	sigma: float, volatility
+	q: float, dividend yield
+	T: float, time to maturity
+	seed: int, root seed of the random number streams
+	next_stream: int, first stream index not yet used by this result
+	pool_size: int, size of the shared normal pool the paths were drawn from, 0 if none
+	pool_offset: int, index in the pool of the first normal used by this result
+	stats: tuple, (n, mean, M2) of the call payoff, the payoff change for a +/-1% bump
+		of the stock price and the pathwise delta estimator'''
+	discount = np.exp(-r * T)
+	n, mean, M2 = stats
+	errors = std_error(stats)
+	return {
+		"params": (S, K, r, sigma, q, T),
+		"seed": seed,
+		"next_stream": next_stream,
+		"pool_size": pool_size,
+		"pool_offset": pool_offset,
+		"stats": stats,
+		"n": n,
+		"price": discount * mean[0],
+		"std_error": discount * errors[0],
+		"delta_fd": discount * mean[1] / (0.02 * S),
+		"delta_pathwise": discount * mean[2],
+	}
+
+def merge_euro_call_results(first, second):
+	'''Merges two pricing results of the same option that were simulated on
+	non-overlapping random number streams.
+
+	first: dict, result from mc_euro_call_controller_stats or mc_euro_call_refine
+	second: dict, result to merge into first'''
+	if first["params"] != second["params"] or first["seed"] != second["seed"] or first["pool_size"] != second["pool_size"]:
+		raise ValueError("Only results for the same option, seed and normal pool can be merged.")
+	return euro_call_result(*first["params"], first["seed"],
+		max(first["next_stream"], second["next_stream"]), first["pool_size"],
+		min(first["pool_offset"], second["pool_offset"]), combine_stats(first["stats"], second["stats"]))
+
+def mc_euro_call_controller_stats(S, K, r, sigma, q, T, total_simulations, workers, seed=None, stream=0, pool_size=0, pool_offset=0, block_size=BLOCK_SIZE, backend="srun"):
+	'''Controller computer function for pricing a European call option using
+	Monte Carlo simulation. Returns the full pricing result including the
+	sufficient statistics needed to refine it later. For a given seed the result
+	does not depend on the number of workers.
+
+	S: float, initial stock price
+	K: float, strike price
+	r: float, risk-free interest rate
+	sigma: float, volatility
+	q: float, dividend yield
+	T: float, time to maturity
+	total_simulations: int, total number of simulations
+	workers: int, number of workers to employ
+	seed: int, root seed of the random number streams, drawn from the OS if None
+	stream: int, stream index for this run, each run must use a fresh one
+	pool_size: int, size of the node-local normal pool to draw from, 0 to generate fresh normals.
+		Runs with the same seed, pool_size and pool_offset use common random numbers.
+	pool_offset: int, index in the pool of the first normal used by this run
+	block_size: int, number of simulations per block
+	backend: str, srun or local, see mc_launcher.launch_workers'''
+	if seed is None:
+		seed = np.random.SeedSequence().entropy
+	# Build the job description passed to every worker as one JSON argument
+	job = {"S": S, "K": K, "r": r, "sigma": sigma, "q": q, "T": T, "total_simulations": total_simulations,
+		"block_size": block_size, "workers": workers, "seed": seed, "stream": stream, "pool_size": pool_size, "pool_offset": pool_offset}
+	# Launch SLURM job and collect results
+	output = launch_workers("mc_euro_call_worker.py", [json.dumps(job, separators=(",", ":"))], workers, backend)
+	# Tree-reduce per-block statistics in block order
+	stats = parse_block_stats(output, shape=(3,))
+	return euro_call_result(S, K, r, sigma, q, T, seed, stream + 1, pool_size, pool_offset, stats)
+
+def mc_euro_call_refine(previous, additional_simulations, workers, backend="srun"):
+	'''Refines an earlier pricing result by simulating only the additional paths
+	on fresh random number streams, or the next unused slice of the normal pool,
+	and merging them in.
+
+	previous: dict, result from mc_euro_call_controller_stats or mc_euro_call_refine
+	additional_simulations: int, number of extra simulations to run
+	workers: int, number of workers to employ
+	backend: str, srun or local, see mc_launcher.launch_workers'''
+	extra = mc_euro_call_controller_stats(*previous["params"], additional_simulations, workers,
+		seed=previous["seed"], stream=previous["next_stream"],
+		pool_size=previous["pool_size"], pool_offset=previous["pool_offset"] + previous["n"], backend=backend)
+	return merge_euro_call_results(previous, extra)
+
 def mc_euro_call_controller(S, K, r, sigma, q, T, total_simulations, workers):
-	'''Controller computer function for pricing a European call option using 
-	Monte Carlo simulation. 
+	'''Controller computer function for pricing a European call option using
+	Monte Carlo simulation.
 
 	S: float, initial stock price
 	K: float, strike price
 	r: float, risk-free interest rate
 	sigma: float, volatility
 	q: float, dividend yield
-	T: int, time to maturity
+	T: float, time to maturity
 	total_simulations: int, total number of simulations
 	workers: int, number of workers to employ'''
-	if total_simulations % workers != 0:
-		total_simulations += (workers - total_simulations % workers)
-		print(f"Total number of simulations adjusted to {total_simulations} to be evenly divisible by {workers} workers.")
-	worker_simulations = int(total_simulations/workers)
-	# Build SLURM job command
-	worker_commands = [S, K, r, sigma, q, T, worker_simulations, total_simulations]
-	command_list = ['srun', f"-N{workers}",'python3','mc_euro_call_worker.py']
-	for i in range(len(worker_commands)):
-		command_list.append(str(worker_commands[i]))
-	# Launch SLURM job and collect results
-	result = subprocess.run(command_list, capture_output=True, text=True, check=True)
-	result = result.stdout.strip()
-	result = list(result.splitlines())
-	for i in range(len(result)):
-		result[i] = float(result[i])
-	# Sum values and discount to present time
-	sum_call = sum(result)
-	call_value = np.exp(-r * T) * sum_call
-	return call_value
+	return mc_euro_call_controller_stats(S, K, r, sigma, q, T, total_simulations, workers)["price"]
 
 if __name__ == "__main__":
 	# Example usage
@@ -47,7 +124,11 @@ if __name__ == "__main__":
 	T = 1
 	total_simulations = 1_000_000
 	workers = 1
-	price = mc_euro_call_controller(S, K, r, sigma, q, T, total_simulations, workers)
+	result = mc_euro_call_controller_stats(S, K, r, sigma, q, T, total_simulations, workers)
 	print(f"Workers = {workers}")
-	print(f"Total Simulations = {total_simulations}")
-	print(f"Price = {price}")
\ No newline at end of file
+	print(f"Total Simulations = {result['n']}")
+	print(f"Price = {result['price']} +/- {result['std_error']}")
+	# Refine the estimate with additional paths instead of starting over
+	result = mc_euro_call_refine(result, total_simulations, workers)
+	print(f"Total Simulations = {result['n']}")
+	print(f"Price = {result['price']} +/- {result['std_error']}")
@@ -1,59 +1,61 @@
 import numpy as np
+import json
+import os
 import sys
+from mc_statistics import worker_blocks, block_stats, format_block_stats
 
 '''Worker computer script for pricing a European call option using Monte Carlo
-simulation. This script should be located in the /home directory of all SLURM 
-worker computers.'''
+simulation. This script should be located in the /home directory of all SLURM
+worker computers, next to normal_pool.py and mc_statistics.py.'''
+
+def mc_euro_call_worker(S, K, r, sigma, q, T, total_simulations, block_size, workers, seed, stream, worker_id, pool_size=0, pool_offset=0):
+    '''Worker computer function for pricing a European call option using Monte Carlo
+    simulation. Returns a list of (block_index, (n, mean, M2)) pairs, one per block of
+    paths simulated on this worker, where mean and M2 hold the call payoff, the payoff
+    change for a +/-1% bump of the stock price and the pathwise delta estimator.
 
-def mc_euro_call_worker(S, K, r, sigma, q, T, worker_simulations, total_simulations):
-    '''Worker computer function for pricing a European call option using Monte Carlo 
-    simulation.
-    
     S: float, initial stock price
     K: float, strike price
     r: float, risk-free interest rate
     sigma: float, volatility
     q: float, dividend yield
-    T: int, time to maturity
-    worker_simulations: int, number of simulations to run on this worker
-    total_simulations: int, total number of simulations'''
+    T: float, time to maturity
+    total_simulations: int, total number of simulations across all workers
+    block_size: int, number of simulations per block
+    workers: int, number of workers employed
+    seed: int, root seed shared by every worker of the pricing run
+    stream: int, index of the refinement round, selects non-overlapping random numbers
+    worker_id: int, index of this worker within the SLURM job
+    pool_size: int, size of the shared normal pool to draw from, 0 to generate fresh normals
+    pool_offset: int, index in the pool of the first normal used by this run'''
     # Precompute constants
     drift = (r - q - 0.5 * sigma**2) * T
     sig_sqrt_t = sigma * np.sqrt(T)
-    up_change = np.log(1.01)
-    down_change = np.log(0.99)
-    sum_call = 0
-    sum_call_change = 0
-    sum_pathwise = 0
-    random_numbers = np.random.randn(worker_simulations)
-    # Simulate asset paths
-    for i in range(worker_simulations):
-        log_st = np.log(S) + drift + sig_sqrt_t * random_numbers[i]
-        call_val = max(0, np.exp(log_st) - K)
-        sum_call += call_val
-        log_su = log_st + up_change
-        call_vu = max(0, np.exp(log_su) - K)
-        log_sd = log_st + down_change
-        call_vd = max(0, np.exp(log_sd) - K)
-        sum_call_change += call_vu - call_vd
-        if np.exp(log_st) > K:
-            sum_pathwise += (np.exp(log_st) / S)
-    # Average payoffs by total simulations
-    return sum_call/total_simulations
+    if pool_size:
+        # Only imported when a pool is used, to keep worker start-up lean
+        import normal_pool
+        pool = normal_pool.load_normal_pool(seed, pool_size)
+    results = []
+    for block_index, start, count in worker_blocks(total_simulations, block_size, workers, worker_id):
+        if pool_size:
+            # Map a disjoint slice of the node-local normal pool
+            random_numbers = normal_pool.pool_slice(pool, pool_offset + start, count)
+        else:
+            # Each (stream, block) pair gets its own independent random number stream
+            rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(stream, block_index)))
+            random_numbers = rng.standard_normal(count)
+        # Simulate a block of asset paths
+        st = np.exp(np.log(S) + drift + sig_sqrt_t * random_numbers)
+        call_val = np.maximum(st - K, 0)
+        call_change = np.maximum(st * 1.01 - K, 0) - np.maximum(st * 0.99 - K, 0)
+        pathwise = np.where(st > K, st / S, 0)
+        results.append((block_index, block_stats(np.stack([call_val, call_change, pathwise]))))
+    return results
 
 if __name__ == "__main__":
-    # Collect arguments from SLURM job command
-    S = float(sys.argv[1]) 
-    K = float(sys.argv[2])
-    r = float(sys.argv[3])
-    sigma = float(sys.argv[4])
-    q = float(sys.argv[5])
-    T = int(sys.argv[6])
-    worker_simulations = int(sys.argv[7])
-    total_simulations = int(sys.argv[8])
-    # Return partial average payoff to controller computer
-    print(mc_euro_call_worker(S, K, r, sigma, q, T, worker_simulations, total_simulations))
-
-
-
-
+    # Collect the JSON job description from SLURM job command
+    job = json.loads(sys.argv[1])
+    worker_id = int(os.environ.get("SLURM_PROCID", 0))
+    # Return per-block statistics to controller computer
+    for block_index, stats in mc_euro_call_worker(**job, worker_id=worker_id):
+        print(format_block_stats(block_index, stats))
@@ -1,9 +1,8 @@
-import numpy as np
-import subprocess
+from mc_generic_controller import mc_generic_controller
 
 '''Controller computer script for pricing a European down-and-out call option using 
-Monte Carlo simulation. This script should be ran in the /home directory of the 
-SLURM controller computer.'''
+Monte Carlo simulation. Paths are simulated by the generic worker, mc_generic_worker.py.
+This script should be ran in the /home directory of the SLURM controller computer.'''
 
 def mc_euro_down_and_out_call_controller(S, K, r, sigma, q, T, H, N, total_simulations, workers):
 	'''Controller computer function for pricing a European down-and-out call option using 
@@ -14,30 +13,13 @@ def mc_euro_down_and_out_call_controller(S, K, r, sigma, q, T, H, N, total_simul
 	r: float, risk-free interest rate
 	sigma: float, volatility
 	q: float, dividend yield
-	T: int, time to maturity
+	T: float, time to maturity
 	H: float, barrier
 	N: int, number of monitoring points
 	total_simulations: int, total number of simulations
 	workers: int, number of workers to employ'''
-	if total_simulations % workers != 0:
-		total_simulations += (workers - total_simulations % workers)
-		print(f"Total number of simulations adjusted to {total_simulations} to be evenly divisible by {workers} workers.")
-	worker_simulations = int(total_simulations/workers)
-	# Build SLURM job command
-	worker_commands = [S, K, r, sigma, q, T, H, N, worker_simulations, total_simulations]
-	command_list = ['srun', f"-N{workers}",'python3','mc_euro_down_and_out_call_worker.py']
-	for i in range(len(worker_commands)):
-		command_list.append(str(worker_commands[i]))
-	# Launch SLURM job and collect results
-	result = subprocess.run(command_list, capture_output=True, text=True, check=True)
-	result = result.stdout.strip()
-	result = list(result.splitlines())
-	for i in range(len(result)):
-		result[i] = float(result[i])
-	# Sum values and discount to present time
-	sum_call = sum(result)
-	call_value = np.exp(-r * T) * sum_call
-	return call_value
+	params = {"S": S, "K": K, "r": r, "sigma": sigma, "q": q, "T": T, "H": H}
+	return mc_generic_controller("gbm", "down_and_out_call", params, N, total_simulations, workers)["price"]
 
 if __name__ == "__main__":  
 	# Example usage
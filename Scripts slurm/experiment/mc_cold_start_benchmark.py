@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from time import time
+from mc_generic_controller import build_generic_job
+from mc_worker_bundle import build_worker_bundle
+
+'''Benchmark of worker process start-up. Times the interpreter, the heavy imports and
+a tiny generic worker job run from the sources and from the bytecode bundle of
+mc_worker_bundle.py, so the fixed per-task cost of a launch can be compared with the
+time spent simulating. This script should be ran in a directory holding the flat
+worker scripts, e.g. the /home directory of a SLURM worker computer.'''
+
+def time_command(command_list, runs, env=None):
+	'''Runs a command repeatedly and returns its mean wall-clock time in seconds.
+
+	command_list: list, command to run
+	runs: int, number of runs to average over
+	env: dict, environment of the command, or None to inherit it'''
+	total_time = 0.0
+	for _ in range(runs):
+		start_time = time()
+		subprocess.run(command_list, stdout=subprocess.DEVNULL, check=True, env=env)
+		total_time += time() - start_time
+	return total_time / runs
+
+if __name__ == "__main__":
+	# Experiment parameters
+	runs = 10
+	source_dir = os.getcwd()
+	job = build_generic_job("gbm", "vanilla_call", {"S": 100, "K": 100, "r": 0.05, "sigma": 0.2, "q": 0.01, "T": 1}, 1, 1_000, 1, seed=2024)
+	payload = json.dumps(job, separators=(",", ":"))
+	python = sys.executable
+	with tempfile.TemporaryDirectory() as bundle_dir, tempfile.TemporaryDirectory() as cache_dir:
+		bundle_path = build_worker_bundle(source_dir, os.path.join(bundle_dir, "mc_worker.pyz"))
+		# A fresh bytecode cache, so existing __pycache__ directories next to the worker
+		# scripts are never read. One bundle run fills it with the bytecode of NumPy and the
+		# standard library, as installed on a node, and nothing is written to it afterwards,
+		# so the worker scripts are compiled from their sources on every run
+		cold_env = dict(os.environ, PYTHONPYCACHEPREFIX=cache_dir)
+		subprocess.run([python, bundle_path, "mc_generic_worker", payload], stdout=subprocess.DEVNULL, check=True, env=cold_env)
+		cold_env["PYTHONDONTWRITEBYTECODE"] = "1"
+		timings = {
+			"interpreter": time_command([python, "-c", "pass"], runs),
+			"import numpy": time_command([python, "-c", "import numpy"], runs),
+			"import scipy.stats": time_command([python, "-c", "import scipy.stats"], runs),
+			"import black_scholes": time_command([python, "-c", "import black_scholes"], runs),
+			"worker from sources": time_command([python, "mc_generic_worker.py", payload], runs, cold_env),
+			"worker from bundle": time_command([python, bundle_path, "mc_generic_worker", payload], runs, cold_env),
+		}
+	print(f"runs = {runs}")
+	for name, runtime in timings.items():
+		print(f"{name} = {round(runtime, 6)} seconds")
@@ -1,12 +1,12 @@
 import numpy as np
 from time import time
 from statistics import mean
-import mc_euro_call_controller
+from mc_euro_call_controller import mc_euro_call_controller
 
 '''Controller computer script for pricing a number of European call options with 
 Monte Carlo for a number of worker computers and asset path simulations. 
 This script should be ran in the /home directory of the SLURM controller 
-computer.'''
+computer, next to euro_call/mc_euro_call_controller.py and its worker.'''
 
 if __name__ == "__main__":
 	# Option Parameters
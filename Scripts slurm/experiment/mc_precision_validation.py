@@ -0,0 +1,76 @@
+import numpy as np
+from time import time
+from mc_scenario_grid_worker import scenario_grid_payoffs
+
+'''Validation benchmark for the float32 simulation mode of the scenario grid worker.
+Every product is priced in float64 and float32 from the same standard normals, and
+the float32 bias is compared against the Monte Carlo standard error. This script can
+be ran on any single computer with mc_scenario_grid_worker.py and mc_payoffs.py in the
+same directory.'''
+
+PAYOFFS = ("vanilla_call", "down_and_out_call", "asian_call_control_variate")
+
+def precision_validation(payoff, S, K, r, sigma, q, T, H, N, total_simulations, block, seed):
+	'''Prices one product in both precisions from common random numbers. Returns the
+	float64 price, its standard error, the float32 bias and both runtimes. For the Asian
+	payoff the price is the control variate portfolio, without the geometric closed form.
+
+	payoff: str, one of PAYOFFS
+	S: float, initial stock price
+	K: float, strike price
+	r: float, risk-free interest rate
+	sigma: float, volatility
+	q: float, dividend yield
+	T: float, time to maturity
+	H: float, barrier, only used by down_and_out_call
+	N: int, number of monitoring points
+	total_simulations: int, total number of simulations
+	block: int, number of paths per vectorized block
+	seed: int, seed of the random number stream'''
+	rng = np.random.default_rng(seed)
+	sums = {np.float64: 0.0, np.float32: 0.0}
+	runtimes = {np.float64: 0.0, np.float32: 0.0}
+	sum_sq = 0.0
+	for start in range(0, total_simulations, block):
+		normals = rng.standard_normal((min(block, total_simulations - start), N))
+		for dtype in sums:
+			grid = [np.array([value], dtype=dtype) for value in (S, sigma, r, T)]
+			start_time = time()
+			payoffs = scenario_grid_payoffs(payoff, K, q, H, *grid, normals.astype(dtype)).ravel()
+			runtimes[dtype] += time() - start_time
+			payoffs = payoffs.astype(np.float64)
+			sums[dtype] += payoffs.sum()
+			if dtype is np.float64:
+				sum_sq += (payoffs * payoffs).sum()
+	discount = np.exp(-r * T)
+	mean_payoff = sums[np.float64] / total_simulations
+	std_error = discount * np.sqrt((sum_sq / total_simulations - mean_payoff**2) / (total_simulations - 1))
+	bias = discount * (sums[np.float32] - sums[np.float64]) / total_simulations
+	return discount * mean_payoff, std_error, bias, runtimes[np.float64], runtimes[np.float32]
+
+if __name__ == "__main__":
+	# Option parameters
+	S = 100
+	K = 100
+	r = 0.05
+	sigma = 0.2
+	q = 0.01
+	T = 1
+	H = 90
+	N = 50
+	# Experiment parameters
+	total_simulations = 2_000_000
+	block = 50_000
+	seed = 2024
+	max_bias_ratio = 0.1 # float32 bias must stay below this fraction of the standard error
+	print(f"sims = {total_simulations}")
+	for payoff in PAYOFFS:
+		steps = 1 if payoff == "vanilla_call" else N
+		price, std_error, bias, runtime_64, runtime_32 = precision_validation(payoff, S, K, r, sigma, q, T, H, steps, total_simulations, block, seed)
+		status = "PASS" if abs(bias) < max_bias_ratio * std_error else "FAIL"
+		print(f"\n{payoff}")
+		print(f"price = {price}")
+		print(f"std_error = {std_error}")
+		print(f"float32 bias = {bias} ({round(abs(bias) / std_error, 6)} std errors) {status}")
+		print(f"float64 time = {round(runtime_64, 6)} seconds")
+		print(f"float32 time = {round(runtime_32, 6)} seconds")
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+from mc_generic_controller import mc_generic_controller
+from mc_pricing_service import price, start_pricing_service
+
+'''Throughput benchmark of the pricing service against one controller call per
+request. Many clients ask for small prices on the same underlying at once, as risk
+processes do. This script can be ran on any single computer with the flat worker
+scripts and mc_pricing_service.py in the same directory, using the local backend.'''
+
+if __name__ == "__main__":
+	# Experiment parameters
+	clients = 16
+	requests = 64
+	workers = 2
+	backend = "local"
+	params = {"S": 100, "r": 0.05, "sigma": 0.2, "q": 0.01, "T": 1}
+	strikes = [80 + 5 * (i % 9) for i in range(requests)]
+	total_simulations = 100_000
+	bodies = [{"model": "gbm", "params": params, "payoff": "vanilla_call", "payoff_params": {"K": K}, "total_simulations": total_simulations} for K in strikes]
+	# One controller call, and so one cluster job, per request
+	start_time = time()
+	with ThreadPoolExecutor(clients) as executor:
+		direct = list(executor.map(lambda K: mc_generic_controller("gbm", "vanilla_call", dict(params, K=K), 1, total_simulations, workers, backend=backend), strikes))
+	direct_time = time() - start_time
+	# Every request through the coalescing service
+	server = start_pricing_service("127.0.0.1", 0, workers, backend)
+	url = f"http://127.0.0.1:{server.server_address[1]}"
+	start_time = time()
+	with ThreadPoolExecutor(clients) as executor:
+		served = list(executor.map(lambda body: price(url, body), bodies))
+	service_time = time() - start_time
+	server.shutdown()
+	server.batcher.close()
+	print(f"requests = {requests}, clients = {clients}, sims = {total_simulations}")
+	print(f"direct = {round(direct_time, 6)} seconds, {round(requests / direct_time, 2)} requests/second")
+	print(f"service = {round(service_time, 6)} seconds, {round(requests / service_time, 2)} requests/second")
+	# Every batched job draws its own seed
+	print(f"cluster jobs = {requests} direct, {len({result['seed'] for result in served})} via the service")
+	print(f"K = {strikes[0]} price = {served[0]['price']} +/- {served[0]['std_error']}")
@@ -0,0 +1,194 @@
+import numpy as np
+import json
+from mc_launcher import launch_workers, launch_shards
+from mc_payoffs import PAYOFFS, CONTROL_VARIATES, MULTI_ASSET_PAYOFFS, PAYOFF_PARAMS
+from mc_models import MODELS, MODEL_PREPARERS, MULTI_ASSET_MODELS
+from mc_profiling import efficiency_summary, parse_profiles
+from mc_statistics import combine_stats, parse_block_stats, std_error
+
+'''Generic controller computer script for pricing any registered payoff under any
+registered path model using Monte Carlo simulation on the SLURM cluster. A new
+product only needs a payoff in mc_payoffs.py, and a new dynamic a model in
+mc_models.py. This script should be ran in the /home directory of the SLURM
+controller computer.'''
+
+BLOCK_SIZE = 100_000
+
+def generic_result(job, stats):
+	'''Builds a pricing result from a job and the merged (n, mean, M2) of its payoffs.
+
+	job: dict, job description the statistics were simulated for
+	stats: tuple, (n, mean, M2) of the undiscounted payoffs'''
+	params = job["params"]
+	discount = np.exp(-params["r"] * params["T"])
+	n, mean, M2 = stats
+	price = discount * mean
+	if job["payoff"] in CONTROL_VARIATES:
+		# Add control variate
+		price = price + CONTROL_VARIATES[job["payoff"]](params, job["N"])
+	return {
+		"job": job,
+		"stats": stats,
+		"n": n,
+		"price": float(price),
+		"std_error": float(discount * std_error(stats)),
+	}
+
+def validate_generic_request(model, payoff, params=None):
+	'''Raises ValueError if a payoff cannot be priced under a model, or with the
+	params, which must hold the payoff params and the right number of assets.
+
+	model: str, name of a model in mc_models.MODELS
+	payoff: str, name of a payoff in mc_payoffs.PAYOFFS
+	params: dict, model and payoff parameters, or None to skip the params checks'''
+	if model not in MODELS:
+		raise ValueError(f"Unknown model {model}, expected one of {tuple(MODELS)}.")
+	if payoff not in PAYOFFS:
+		raise ValueError(f"Unknown payoff {payoff}, expected one of {tuple(PAYOFFS)}.")
+	if payoff in CONTROL_VARIATES and model != "gbm":
+		raise ValueError(f"The control variate of {payoff} is only valid for the gbm model.")
+	if (payoff in MULTI_ASSET_PAYOFFS) != (model in MULTI_ASSET_MODELS):
+		kind = "multi-asset" if payoff in MULTI_ASSET_PAYOFFS else "single-asset"
+		raise ValueError(f"Payoff {payoff} is {kind} and cannot be priced under the {model} model.")
+	if params is not None:
+		missing = [name for name in PAYOFF_PARAMS[payoff] if name not in params]
+		if missing:
+			raise ValueError(f"Payoff {payoff} needs the params {missing}.")
+	if params is not None and "S" in params:
+		assets = len(np.atleast_1d(params["S"]))
+		if model not in MULTI_ASSET_MODELS and np.ndim(params["S"]) != 0:
+			raise ValueError(f"The {model} model simulates one asset, S must be a number.")
+		if assets < MULTI_ASSET_PAYOFFS.get(payoff, 1):
+			raise ValueError(f"Payoff {payoff} needs at least {MULTI_ASSET_PAYOFFS[payoff]} assets, S has {assets}.")
+		if payoff in MULTI_ASSET_PAYOFFS and "weights" in params and len(np.atleast_1d(params["weights"])) != assets:
+			raise ValueError(f"Payoff {payoff} needs {assets} weights, one per asset, got {len(np.atleast_1d(params['weights']))}.")
+
+def build_generic_job(model, payoff, params, N, total_simulations, workers, seed=None, stream=0, pool_size=0, pool_offset=0, precision="float64", block_size=BLOCK_SIZE, products=None, profile=False):
+	'''Validates a pricing request and returns the job description the generic
+	worker runs. Arguments are as for mc_generic_controller, products as for
+	mc_generic_batch_controller, with payoff None.'''
+	for name, product_params in [[payoff, {}]] if products is None else products:
+		validate_generic_request(model, name, dict(params, **product_params))
+	if seed is None:
+		seed = np.random.SeedSequence().entropy
+	if model in MODEL_PREPARERS:
+		params = MODEL_PREPARERS[model](params)
+	job = {
+		"model": model,
+		"payoff": payoff,
+		"params": params,
+		"N": N,
+		"assets": len(np.atleast_1d(params["S"])),
+		"total_simulations": total_simulations,
+		"block_size": block_size,
+		"workers": workers,
+		"seed": seed,
+		"stream": stream,
+		"pool_size": pool_size,
+		"pool_offset": pool_offset,
+		"precision": precision,
+	}
+	if products is not None:
+		job["products"] = [[name, dict(product_params)] for name, product_params in products]
+	if profile:
+		job["profile"] = True
+	return job
+
+def mc_generic_controller(model, payoff, params, N, total_simulations, workers, seed=None, stream=0, pool_size=0, pool_offset=0, precision="float64", block_size=BLOCK_SIZE, backend="srun", retries=0, timeout=None, checkpoint_dir=None, profile=False):
+	'''Controller computer function for pricing a registered payoff under a registered
+	path model using Monte Carlo simulation. Returns a dict with the price, its standard
+	error, the merged (n, mean, M2) statistics and the job, which mc_generic_refine uses,
+	and the efficiency summary of mc_profiling if profile is set.
+
+	model: str, name of a model in mc_models.MODELS
+	payoff: str, name of a payoff in mc_payoffs.PAYOFFS
+	params: dict, model and payoff parameters, r and T are used for discounting,
+		S is a list of initial stock prices for multi-asset models
+	N: int, number of monitoring points
+	total_simulations: int, total number of simulations
+	workers: int, number of workers to employ
+	seed: int, root seed of the random number streams, drawn from the OS if None
+	stream: int, stream index for this run, each run must use a fresh one
+	pool_size: int, size of the node-local normal pool to draw from, 0 to generate fresh normals
+	pool_offset: int, index in the pool of the first normal used by this run
+	precision: str, float64 or float32 path arithmetic, payoff statistics are float64 either way
+	block_size: int, number of simulations per block
+	backend: str, srun or local, see mc_launcher.launch_workers
+	retries: int, number of times a failed or timed-out worker shard is retried
+	timeout: float, seconds before a worker shard is killed and retried, or None
+	checkpoint_dir: str, directory to checkpoint completed shards in, reruns of the same
+		job resume from it. Any of retries, timeout or checkpoint_dir launches every
+		worker as its own shard, see mc_launcher.launch_shards. Pass an explicit seed
+		to resume a job.
+	profile: bool, profile every worker, see mc_profiling.py'''
+	job = build_generic_job(model, payoff, params, N, total_simulations, workers, seed, stream, pool_size, pool_offset, precision, block_size, profile=profile)
+	# Launch SLURM job and tree-reduce per-block statistics in block order
+	if retries or timeout or checkpoint_dir:
+		output = launch_shards("mc_generic_worker.py", job, workers, backend, retries, timeout, checkpoint_dir)
+	else:
+		output = launch_workers("mc_generic_worker.py", [json.dumps(job, separators=(",", ":"))], workers, backend)
+	result = generic_result(job, parse_block_stats(output))
+	if profile:
+		result["profile"] = efficiency_summary(parse_profiles(output))
+	return result
+
+def mc_generic_refine(previous, additional_simulations, workers, backend="srun", retries=0, timeout=None, checkpoint_dir=None):
+	'''Refines an earlier pricing result by simulating only the additional paths
+	on fresh random number streams, or the next unused slice of the normal pool,
+	and merging them in.
+
+	previous: dict, result from mc_generic_controller or mc_generic_refine
+	additional_simulations: int, number of extra simulations to run
+	workers: int, number of workers to employ
+	backend: str, srun or local, see mc_launcher.launch_workers
+	retries, timeout: as for mc_generic_controller
+	checkpoint_dir: str, directory to checkpoint the shards of this refinement in, it
+		must differ from the one of the previous run, whose job is different'''
+	job = previous["job"]
+	extra = mc_generic_controller(job["model"], job["payoff"], job["params"], job["N"], additional_simulations, workers,
+		seed=job["seed"], stream=job["stream"] + 1, pool_size=job["pool_size"],
+		pool_offset=job["pool_offset"] + job["total_simulations"] * job["N"] * job["assets"],
+		precision=job["precision"], block_size=job["block_size"], backend=backend,
+		retries=retries, timeout=timeout, checkpoint_dir=checkpoint_dir)
+	# The merged result keeps the job of the latest run, so the next refinement continues after it
+	return generic_result(extra["job"], combine_stats(previous["stats"], extra["stats"]))
+
+def mc_generic_batch_controller(model, params, products, N, total_simulations, workers, seed=None, precision="float64", block_size=BLOCK_SIZE, backend="srun", profile=False):
+	'''Prices several payoffs on the same simulated paths of one model with a single
+	cluster job. Returns one pricing result per product, as for mc_generic_controller,
+	whose job holds the payoff and the merged parameters of that product. With profile
+	set, every result holds the efficiency summary of the shared job.
+
+	model: str, name of a model in mc_models.MODELS
+	params: dict, model parameters shared by every product, r and T are used for discounting
+	products: list, [payoff, payoff_params] pairs, payoff_params such as K and H are
+		added to params for that payoff only
+	N: int, number of monitoring points
+	Other arguments are as for mc_generic_controller.'''
+	job = build_generic_job(model, None, params, N, total_simulations, workers, seed, precision=precision, block_size=block_size, products=products, profile=profile)
+	# Launch SLURM job and tree-reduce per-block statistics of every product in block order
+	output = launch_workers("mc_generic_worker.py", [json.dumps(job, separators=(",", ":"))], workers, backend)
+	n, means, M2s = parse_block_stats(output, shape=(len(products),))
+	results = []
+	for index, (payoff, product_params) in enumerate(job["products"]):
+		product_job = dict(job, payoff=payoff, params=dict(job["params"], **product_params))
+		del product_job["products"]
+		results.append(generic_result(product_job, (n, means[index], M2s[index])))
+	if profile:
+		summary = efficiency_summary(parse_profiles(output))
+		for result in results:
+			result["profile"] = summary
+	return results
+
+if __name__ == "__main__":
+	# Example usage
+	model = "gbm"
+	payoff = "down_and_out_call"
+	params = {"S": 100, "K": 100, "r": 0.06, "sigma": 0.2, "q": 0.03, "T": 1, "H": 99}
+	N = 10
+	total_simulations = 1_000_000
+	workers = 1
+	result = mc_generic_controller(model, payoff, params, N, total_simulations, workers)
+	print(f"Workers = {workers}")
+	print(f"Total Simulations = {result['n']}")
+	print(f"Price = {result['price']} +/- {result['std_error']}")
@@ -0,0 +1,86 @@
+import numpy as np
+import json
+import os
+import sys
+from mc_models import MODELS
+from mc_payoffs import PAYOFFS
+from mc_statistics import worker_blocks, block_stats, format_block_stats
+
+'''Generic worker computer script for pricing any registered payoff under any
+registered path model using vectorized Monte Carlo simulation. The whole job is
+passed as one JSON argument. This script should be located in the /home directory
+of all SLURM worker computers, next to mc_models.py, mc_payoffs.py, mc_statistics.py
+and normal_pool.py.'''
+
+PRECISIONS = {"float64": np.float64, "float32": np.float32}
+
+def block_normals(job, block_index, start, count, pool=None):
+	'''Returns the standard normals of one block of paths with shape (count, N), or
+	(count, N, assets) for jobs with more than one asset.
+
+	job: dict, job description built by mc_generic_controller
+	block_index: int, global index of the block
+	start: int, index of the first path of the block
+	count: int, number of paths in the block
+	pool: np.memmap, normal pool from normal_pool.load_normal_pool, or None'''
+	N = job["N"]
+	assets = job["assets"]
+	shape = (count, N) if assets == 1 else (count, N, assets)
+	dtype = PRECISIONS[job["precision"]]
+	if pool is not None:
+		import normal_pool
+		normals = normal_pool.pool_slice(pool, job["pool_offset"] + start * N * assets, count * N * assets)
+		return normals.reshape(shape).astype(dtype, copy=False)
+	rng = np.random.default_rng(np.random.SeedSequence(job["seed"], spawn_key=(job["stream"], block_index)))
+	return rng.standard_normal(shape, dtype=dtype)
+
+def mc_generic_worker(job, worker_id, profiler=None):
+	'''Generic worker computer function. Returns a list of (block_index, (n, mean, M2))
+	pairs, one per block of paths simulated on this worker. Batch jobs with products
+	price every product on the same paths, their mean and M2 hold one entry per product.
+
+	job: dict, job description built by mc_generic_controller
+	worker_id: int, index of this worker within the SLURM job
+	profiler: mc_profiling.BlockProfiler, records every block if given'''
+	model = MODELS[job["model"]]
+	params = job["params"]
+	pool = None
+	if job["pool_size"]:
+		# Only imported when a pool is used, to keep worker start-up lean
+		import normal_pool
+		pool = normal_pool.load_normal_pool(job["seed"], job["pool_size"])
+	results = []
+	for block_index, start, count in worker_blocks(job["total_simulations"], job["block_size"], job["workers"], worker_id):
+		if profiler is not None:
+			profiler.start_block()
+		normals = block_normals(job, block_index, start, count, pool)
+		if profiler is not None:
+			profiler.rng_done()
+		paths = model(params, normals)
+		if "products" in job:
+			payoffs = [PAYOFFS[payoff](paths, dict(params, **product_params)) for payoff, product_params in job["products"]]
+			results.append((block_index, block_stats(np.stack(payoffs))))
+		else:
+			results.append((block_index, block_stats(PAYOFFS[job["payoff"]](paths, params))))
+		if profiler is not None:
+			profiler.end_block(block_index, count)
+	return results
+
+if __name__ == "__main__":
+	# Collect the JSON job description and optional shard index from SLURM job command
+	job = json.loads(sys.argv[1])
+	worker_id = int(sys.argv[2]) if len(sys.argv) > 2 else int(os.environ.get("SLURM_PROCID", 0))
+	if len(sys.argv) > 2:
+		# Launched as a shard, tell launch_shards which node to avoid if this shard stalls
+		from mc_launcher import announce_shard_node
+		announce_shard_node()
+	profiler = None
+	if job.get("profile"):
+		# Only imported when profiling, to keep worker start-up lean
+		import mc_profiling
+		profiler = mc_profiling.BlockProfiler()
+	# Return per-block statistics, and the profile if enabled, to controller computer
+	for block_index, stats in mc_generic_worker(job, worker_id, profiler):
+		print(format_block_stats(block_index, stats))
+	if profiler is not None:
+		print(mc_profiling.format_profile(profiler.summary(worker_id)))
@@ -0,0 +1,256 @@
+import argparse
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+import numpy as np
+
+'''Command line entry point that runs a pricing job described in a JSON or YAML job
+file, so a production sweep is one command instead of edits to the __main__ blocks of
+the controllers. Every grid point is priced with one cluster job that receives the
+whole job description as a single JSON argument. YAML job files need PyYAML. This
+script should be ran in the /home directory of the SLURM controller computer.
+
+Usage: python3 mc_cli.py job.json [--workers 8] [--tasks-per-node 16] [--backend local] [--output prices.csv] [--profile]
+
+Job file keys:
+	engine: generic (default), scenario_grid, lsm or mlmc
+	model: name of a model in mc_models.MODELS, default gbm
+	params: model parameters shared by every grid point, e.g. S, r, sigma, q and T
+	grid: lists of values for params to sweep, every combination is priced
+	products: dicts with a payoff and its params such as K, a list of values prices
+		every value, e.g. {"payoff": "vanilla_call", "K": [90, 100, 110]}. The
+		scenario_grid engine takes single-asset payoffs, the lsm engine put or call.
+	N, total_simulations, precision, seed, block_size: as for mc_generic_controller
+	engine_options: extra keyword arguments of the engine's controller, see
+		ENGINE_OPTIONS, e.g. epsilon for mlmc or pilot_simulations and degree for lsm.
+		Grid keys, precisions and engine options an engine does not support are refused
+	backend, workers: where and on how many nodes to run
+	tasks_per_node: worker tasks on every node, e.g. its core count, default 1. The
+		blocks are split across all workers * tasks_per_node tasks
+	profile: true to profile every worker of the generic engine, the efficiency
+		summary of every cluster job is written to stderr, see mc_profiling.py
+	output: {"format": "table", "json" or "csv", "path": file to write, stdout if missing}'''
+
+ENGINES = ("generic", "scenario_grid", "lsm", "mlmc")
+# Grid keys the scenario grid sweeps, the other engines sweep any params
+SCENARIO_GRID_KEYS = ("S", "sigma", "r", "T")
+ENGINE_PRECISIONS = {"generic": ("float64", "float32"), "scenario_grid": ("float64", "float32"), "lsm": ("float64",), "mlmc": ("float64",)}
+ENGINE_OPTIONS = {
+	"generic": (),
+	"scenario_grid": ("pool_size",),
+	"lsm": ("pilot_simulations", "degree"),
+	"mlmc": ("epsilon", "N0", "M", "initial_simulations", "min_levels", "max_levels", "alpha"),
+}
+OUTPUT_FORMATS = ("table", "json", "csv")
+
+def load_job_file(path):
+	'''Reads a job file, YAML if it ends in .yaml or .yml and JSON otherwise.
+
+	path: str, path of the job file'''
+	with open(path) as job_file:
+		if path.endswith((".yaml", ".yml")):
+			try:
+				import yaml
+			except ImportError:
+				raise ValueError("YAML job files need PyYAML, install it or use a JSON job file.")
+			return yaml.safe_load(job_file)
+		return json.load(job_file)
+
+def expand_products(products):
+	'''Expands products with lists of parameter values into one product per combination.
+
+	products: list, dicts with a payoff and its params'''
+	expanded = []
+	for product in products:
+		names = [name for name in product if name != "payoff"]
+		values = [value if isinstance(value, list) else [value] for value in (product[name] for name in names)]
+		for combination in itertools.product(*values):
+			expanded.append(dict(zip(names, combination), payoff=product["payoff"]))
+	return expanded
+
+def grid_points(params, grid):
+	'''Returns the params of every point of the grid, the last grid axis varying fastest.
+
+	params: dict, parameters shared by every point
+	grid: dict, list of values per swept parameter'''
+	names = list(grid)
+	return [dict(params, **dict(zip(names, values))) for values in itertools.product(*(grid[name] for name in names))]
+
+def run_generic(spec):
+	'''Prices every product at every grid point, products of a point share one cluster job.'''
+	from mc_generic_controller import mc_generic_batch_controller
+	from mc_profiling import format_efficiency_summary
+	rows = []
+	products = [[product["payoff"], {name: value for name, value in product.items() if name != "payoff"}] for product in spec["products"]]
+	for point in grid_points(spec["params"], spec["grid"]):
+		results = mc_generic_batch_controller(spec["model"], point, products, spec["N"], spec["total_simulations"], spec["tasks"],
+			spec["seed"], spec["precision"], spec["block_size"], spec["backend"], spec["profile"])
+		if spec["profile"]:
+			sys.stderr.write(f"Grid point {point}\n{format_efficiency_summary(results[0]['profile'])}")
+		for product, result in zip(spec["products"], results):
+			rows.append(dict(point, **product, price=result["price"], std_error=result["std_error"], n=result["n"]))
+	return rows
+
+def run_scenario_grid(spec):
+	'''Prices every product across the S, sigma, r and T grid with one cluster job per product.'''
+	from mc_scenario_grid_controller import mc_scenario_grid_controller
+	params = spec["params"]
+	axes = {name: spec["grid"].get(name, [params[name]]) for name in ("S", "sigma", "r", "T")}
+	rows = []
+	for product in spec["products"]:
+		result = mc_scenario_grid_controller(product["payoff"], product["K"], params.get("q", 0), axes["S"], axes["sigma"], axes["r"], axes["T"],
+			spec["total_simulations"], spec["tasks"], product.get("H", 0), spec["N"], spec["seed"], precision=spec["precision"],
+			block_size=spec["block_size"], backend=spec["backend"], **spec["engine_options"])
+		for index in np.ndindex(result["price"].shape):
+			point = {name: float(result[name][axis]) for name, axis in zip(("S", "sigma", "r", "T"), index)}
+			rows.append(dict(params, **point, **product, price=result["price"][index], std_error=result["std_error"][index], n=result["n"]))
+	return rows
+
+def run_lsm(spec):
+	'''Prices every put or call product at every grid point with least-squares Monte Carlo.'''
+	from mc_lsm_controller import mc_lsm_controller
+	options = dict(spec["engine_options"])
+	pilot_simulations = options.pop("pilot_simulations", spec["total_simulations"])
+	rows = []
+	for point in grid_points(spec["params"], spec["grid"]):
+		model_params = {name: value for name, value in point.items() if name not in ("S", "r", "sigma", "q", "T")}
+		for product in spec["products"]:
+			result = mc_lsm_controller(point["S"], product["K"], point["r"], point["sigma"], point.get("q", 0), point["T"], spec["N"],
+				product["payoff"], pilot_simulations, spec["total_simulations"], spec["tasks"], model=spec["model"],
+				model_params=model_params, seed=spec["seed"], block_size=spec["block_size"], backend=spec["backend"], **options)
+			rows.append(dict(point, **product, price=result["price"], std_error=result["std_error"], n=result["n"]))
+	return rows
+
+def run_mlmc(spec):
+	'''Prices every product at every grid point with multilevel Monte Carlo to the epsilon engine option.'''
+	from mc_mlmc_controller import mc_mlmc_controller
+	options = dict(spec["engine_options"])
+	epsilon = options.pop("epsilon")
+	rows = []
+	for point in grid_points(spec["params"], spec["grid"]):
+		for product in spec["products"]:
+			product_params = {name: value for name, value in product.items() if name != "payoff"}
+			result = mc_mlmc_controller(spec["model"], product["payoff"], dict(point, **product_params), epsilon, spec["tasks"],
+				seed=spec["seed"], block_size=spec["block_size"], backend=spec["backend"], **options)
+			rows.append(dict(point, **product, price=result["price"], std_error=result["std_error"], n=sum(result["n"])))
+	return rows
+
+RUNNERS = {"generic": run_generic, "scenario_grid": run_scenario_grid, "lsm": run_lsm, "mlmc": run_mlmc}
+
+def build_spec(job):
+	'''Validates a job file and fills in the defaults. Returns the full job description.
+
+	job: dict, decoded job file'''
+	from mc_generic_controller import BLOCK_SIZE
+	unknown = set(job) - {"engine", "model", "params", "grid", "products", "N", "total_simulations", "precision", "seed", "block_size", "engine_options", "backend", "workers", "tasks_per_node", "output", "profile"}
+	if unknown:
+		raise ValueError(f"Unknown job file keys {sorted(unknown)}.")
+	spec = {
+		"engine": job.get("engine", "generic"),
+		"model": job.get("model", "gbm"),
+		"params": dict(job.get("params", {})),
+		"grid": dict(job.get("grid", {})),
+		"products": expand_products(job.get("products", [])),
+		"N": int(job.get("N", 1)),
+		"total_simulations": int(job.get("total_simulations", 1_000_000)),
+		"precision": job.get("precision", "float64"),
+		# One seed for the whole sweep, so grid points use common random numbers
+		"seed": job["seed"] if job.get("seed") is not None else np.random.SeedSequence().entropy,
+		"block_size": int(job.get("block_size", BLOCK_SIZE)),
+		"engine_options": dict(job.get("engine_options", {})),
+		"backend": job.get("backend", "srun"),
+		"workers": int(job.get("workers", 1)),
+		"tasks_per_node": int(job.get("tasks_per_node", 1)),
+		"output": dict({"format": "table", "path": None}, **job.get("output", {})),
+		"profile": bool(job.get("profile", False)),
+	}
+	if spec["workers"] < 1 or spec["tasks_per_node"] < 1:
+		raise ValueError("workers and tasks_per_node must be positive.")
+	# Every task is a worker of its own, so the blocks are split across all of them
+	spec["tasks"] = spec["workers"] * spec["tasks_per_node"]
+	if spec["engine"] not in ENGINES:
+		raise ValueError(f"Unknown engine {spec['engine']}, expected one of {ENGINES}.")
+	engine = spec["engine"]
+	if spec["precision"] not in ENGINE_PRECISIONS[engine]:
+		raise ValueError(f"The {engine} engine does not support precision {spec['precision']}, expected one of {ENGINE_PRECISIONS[engine]}.")
+	unsupported = set(spec["engine_options"]) - set(ENGINE_OPTIONS[engine])
+	if unsupported:
+		expected = f"expected some of {ENGINE_OPTIONS[engine]}" if ENGINE_OPTIONS[engine] else "it takes none"
+		raise ValueError(f"The {engine} engine does not take the engine options {sorted(unsupported)}, {expected}.")
+	if engine == "mlmc" and "epsilon" not in spec["engine_options"]:
+		raise ValueError("The mlmc engine needs the epsilon engine option.")
+	if engine == "scenario_grid" and set(spec["grid"]) - set(SCENARIO_GRID_KEYS):
+		raise ValueError(f"The scenario_grid engine only sweeps {SCENARIO_GRID_KEYS}, not {sorted(set(spec['grid']) - set(SCENARIO_GRID_KEYS))}.")
+	if spec["output"]["format"] not in OUTPUT_FORMATS:
+		raise ValueError(f"Unknown output format {spec['output']['format']}, expected one of {OUTPUT_FORMATS}.")
+	if spec["profile"] and spec["engine"] != "generic":
+		raise ValueError("Profiling is only supported by the generic engine.")
+	if not spec["products"]:
+		raise ValueError("The job file needs at least one product.")
+	for name, values in spec["grid"].items():
+		if not isinstance(values, list) or not values:
+			raise ValueError(f"Grid values of {name} must be a non-empty list.")
+	return spec
+
+def format_rows(rows, output_format):
+	'''Renders result rows as an aligned table, JSON or CSV.
+
+	rows: list, dicts of parameters and results, one per priced product and grid point
+	output_format: str, one of OUTPUT_FORMATS'''
+	# Plain floats and ints, so NumPy scalars render and serialize like the parameters
+	rows = [{name: value.item() if isinstance(value, np.generic) else value for name, value in row.items()} for row in rows]
+	columns = list(dict.fromkeys(name for row in rows for name in row))
+	if output_format == "json":
+		return json.dumps(rows, indent=1) + "\n"
+	if output_format == "csv":
+		buffer = io.StringIO()
+		writer = csv.DictWriter(buffer, fieldnames=columns, lineterminator="\n")
+		writer.writeheader()
+		writer.writerows(rows)
+		return buffer.getvalue()
+	cells = [columns] + [[str(row.get(name, "")) for name in columns] for row in rows]
+	widths = [max(len(line[index]) for line in cells) for index in range(len(columns))]
+	return "".join("  ".join(cell.rjust(width) for cell, width in zip(line, widths)) + "\n" for line in cells)
+
+def run_job(job):
+	'''Runs a decoded job file and returns its full description and result rows.
+
+	job: dict, decoded job file'''
+	spec = build_spec(job)
+	# mc_launcher packs this many tasks on every node
+	os.environ["MC_TASKS_PER_NODE"] = str(spec["tasks_per_node"])
+	rows = RUNNERS[spec["engine"]](spec)
+	for row in rows:
+		row["seed"] = spec["seed"]
+	return spec, rows
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Run a Monte Carlo pricing job file on the SLURM cluster.")
+	parser.add_argument("job_file", help="JSON or YAML job file")
+	parser.add_argument("--workers", type=int, help="number of worker nodes, overrides the job file")
+	parser.add_argument("--tasks-per-node", type=int, help="worker tasks per node, e.g. its core count, overrides the job file")
+	parser.add_argument("--backend", choices=("srun", "local"), help="overrides the job file")
+	parser.add_argument("--output", help="file to write the results to, overrides the job file")
+	parser.add_argument("--profile", action="store_true", help="profile every worker, see mc_profiling.py")
+	arguments = parser.parse_args()
+	job = load_job_file(arguments.job_file)
+	if arguments.workers is not None:
+		job["workers"] = arguments.workers
+	if arguments.tasks_per_node is not None:
+		job["tasks_per_node"] = arguments.tasks_per_node
+	if arguments.backend is not None:
+		job["backend"] = arguments.backend
+	if arguments.profile:
+		job["profile"] = True
+	if arguments.output is not None:
+		job["output"] = dict(job.get("output", {}), path=arguments.output)
+	spec, rows = run_job(job)
+	text = format_rows(rows, spec["output"]["format"])
+	if spec["output"]["path"]:
+		with open(spec["output"]["path"], "w") as output_file:
+			output_file.write(text)
+	else:
+		sys.stdout.write(text)
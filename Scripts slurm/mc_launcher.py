@@ -0,0 +1,185 @@
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+from time import time
+
+'''Launches worker scripts across the cluster and collects their standard output.
+The srun backend runs one task per SLURM node, or MC_TASKS_PER_NODE tasks per node
+when it is set, e.g. to the core count of the nodes, and the local backend runs the
+same tasks as processes on this computer for testing without a cluster. launch_shards
+runs every worker shard as its own task instead, so failed or timed-out shards can
+be checkpointed around and retried on other nodes. Workers run from a prebuilt
+bytecode bundle, see mc_worker_bundle.py, when MC_WORKER_BUNDLE is set. This script
+should be located in the /home directory of the SLURM controller computer.'''
+
+BACKENDS = ("srun", "local")
+SHARD_NODE_PREFIX = "mc shard node: "
+
+def announce_shard_node():
+	'''Writes the node a shard runs on to stderr as soon as the shard starts, so
+	launch_shards knows which node to exclude even if the shard then hangs.'''
+	node = os.environ.get("SLURMD_NODENAME", socket.gethostname())
+	print(f"{SHARD_NODE_PREFIX}{node}", file=sys.stderr, flush=True)
+
+def worker_command(script, python='python3'):
+	'''Returns the command prefix that runs a worker script, from the bundle on
+	node-local disk if MC_WORKER_BUNDLE is set.
+
+	script: str, worker script to run
+	python: str, Python interpreter to run it with'''
+	bundle = os.environ.get("MC_WORKER_BUNDLE")
+	if bundle:
+		return [python, bundle, os.path.splitext(os.path.basename(script))[0]]
+	return [python, script]
+
+def tasks_per_node():
+	'''Returns the number of worker tasks srun packs on every node, from MC_TASKS_PER_NODE.'''
+	tasks = int(os.environ.get("MC_TASKS_PER_NODE", 1))
+	if tasks < 1:
+		raise ValueError(f"MC_TASKS_PER_NODE must be positive, got {tasks}.")
+	return tasks
+
+def launch_workers(script, args, workers, backend="srun"):
+	'''Runs a worker script on every worker and returns their concatenated stdout.
+	Each worker finds its index in the SLURM_PROCID environment variable. Workers are
+	tasks, with MC_TASKS_PER_NODE set srun packs that many of them on every node.
+
+	script: str, worker script to run
+	args: list, command line arguments for the worker script
+	workers: int, number of worker tasks to employ, the blocks are split across all of them
+	backend: str, srun to launch on the SLURM cluster, local to run processes on this computer'''
+	args = [str(arg) for arg in args]
+	if backend == "srun":
+		tasks = tasks_per_node()
+		if tasks == 1:
+			command_list = ['srun', f"-N{workers}"]
+		else:
+			command_list = ['srun', f"-N{-(-workers // tasks)}", f"-n{workers}", f"--ntasks-per-node={tasks}"]
+		command_list += worker_command(script) + args
+		result = subprocess.run(command_list, capture_output=True, text=True, check=True)
+		return result.stdout
+	if backend == "local":
+		processes = []
+		for worker_id in range(workers):
+			env = dict(os.environ, SLURM_PROCID=str(worker_id), SLURM_NTASKS=str(workers))
+			processes.append(subprocess.Popen(worker_command(script, sys.executable) + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env))
+		outputs = []
+		for process in processes:
+			stdout, stderr = process.communicate()
+			if process.returncode != 0:
+				raise subprocess.CalledProcessError(process.returncode, process.args, stdout, stderr)
+			outputs.append(stdout)
+		return "".join(outputs)
+	raise ValueError(f"Unknown backend {backend}, expected one of {BACKENDS}.")
+
+def shard_command(script, args, shard, backend, exclude):
+	'''Returns the command that runs one shard of a worker script.
+
+	script: str, worker script to run
+	args: list, command line arguments for the worker script, the shard index is appended
+	shard: int, index of the shard, used by the worker in place of SLURM_PROCID
+	backend: str, srun or local
+	exclude: set, nodes that a shard failed on, skipped by srun'''
+	args = [str(arg) for arg in args] + [str(shard)]
+	if backend == "srun":
+		command_list = ['srun', '-N1', '-n1']
+		if exclude:
+			command_list.append(f"--exclude={','.join(sorted(exclude))}")
+		return command_list + worker_command(script) + args
+	if backend == "local":
+		return worker_command(script, sys.executable) + args
+	raise ValueError(f"Unknown backend {backend}, expected one of {BACKENDS}.")
+
+def read_checkpoints(checkpoint_dir, job, shards):
+	'''Returns the stdout of every shard already checkpointed for this job. The job
+	description is stored with the checkpoints, a different job is refused.
+
+	checkpoint_dir: str, directory holding the shard checkpoints
+	job: dict, job description the shards belong to
+	shards: int, number of shards'''
+	os.makedirs(checkpoint_dir, exist_ok=True)
+	job_path = os.path.join(checkpoint_dir, "job.json")
+	if os.path.exists(job_path):
+		with open(job_path) as job_file:
+			if json.load(job_file) != json.loads(json.dumps(job)):
+				raise ValueError(f"Checkpoint directory {checkpoint_dir} belongs to a different job.")
+	else:
+		with open(job_path, "w") as job_file:
+			json.dump(job, job_file)
+	outputs = {}
+	for shard in range(shards):
+		path = os.path.join(checkpoint_dir, f"shard_{shard}.txt")
+		if os.path.exists(path):
+			with open(path) as shard_file:
+				outputs[shard] = shard_file.read()
+	return outputs
+
+def write_checkpoint(checkpoint_dir, shard, output):
+	'''Atomically stores the stdout of a completed shard.
+
+	checkpoint_dir: str, directory holding the shard checkpoints
+	shard: int, index of the shard
+	output: str, stdout of the shard'''
+	path = os.path.join(checkpoint_dir, f"shard_{shard}.txt")
+	tmp_path = f"{path}.{os.getpid()}.tmp"
+	with open(tmp_path, "w") as shard_file:
+		shard_file.write(output)
+	os.replace(tmp_path, path)
+
+def launch_shards(script, job, shards, backend="srun", retries=2, timeout=None, checkpoint_dir=None):
+	'''Runs every shard of a job as its own task and returns their concatenated stdout
+	in shard order. Shards that fail or time out are retried up to retries times,
+	excluding the nodes they failed or stalled on, as named by srun or reported by the
+	shard with announce_shard_node. Completed shards are checkpointed, so a rerun
+	of the same job with the same checkpoint_dir only simulates the missing shards.
+	Each shard keeps its random number streams, so the result is identical to a run
+	without failures.
+
+	script: str, worker script taking the JSON job and the shard index
+	job: dict, job description passed to every shard
+	shards: int, number of shards, one per worker
+	backend: str, srun or local
+	retries: int, number of extra attempts per shard
+	timeout: float, seconds before a shard is killed and retried, or None
+	checkpoint_dir: str, directory for shard checkpoints, or None to keep them in memory'''
+	payload = json.dumps(job, separators=(",", ":"))
+	outputs = read_checkpoints(checkpoint_dir, job, shards) if checkpoint_dir else {}
+	exclude = set()
+	errors = {}
+	for attempt in range(retries + 1):
+		pending = [shard for shard in range(shards) if shard not in outputs]
+		if not pending:
+			break
+		processes = {}
+		deadline = None if timeout is None else time() + timeout
+		for shard in pending:
+			env = dict(os.environ, SLURM_PROCID=str(shard), SLURM_NTASKS=str(shards))
+			processes[shard] = subprocess.Popen(shard_command(script, [payload], shard, backend, exclude), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
+		for shard, process in processes.items():
+			try:
+				stdout, stderr = process.communicate(timeout=None if deadline is None else max(deadline - time(), 0))
+			except subprocess.TimeoutExpired:
+				process.kill()
+				stdout, stderr = process.communicate()
+				if process.returncode != 0:
+					# The stalled shard named its node before hanging, unless it exited before the kill
+					exclude.update(re.findall(rf"^{SHARD_NODE_PREFIX}(\S+)$", stderr, re.MULTILINE))
+					errors[shard] = f"timed out after {timeout} seconds"
+					continue
+			if process.returncode != 0:
+				# srun names the failing node, e.g. "srun: error: node3: task 0: Exited with exit code 1"
+				exclude.update(re.findall(r"srun: error: (\S+): task", stderr))
+				exclude.update(re.findall(rf"^{SHARD_NODE_PREFIX}(\S+)$", stderr, re.MULTILINE))
+				errors[shard] = stderr.strip().splitlines()[-1] if stderr.strip() else f"exit code {process.returncode}"
+				continue
+			outputs[shard] = stdout
+			if checkpoint_dir:
+				write_checkpoint(checkpoint_dir, shard, stdout)
+	failed = [shard for shard in range(shards) if shard not in outputs]
+	if failed:
+		details = "; ".join(f"shard {shard}: {errors.get(shard)}" for shard in failed)
+		raise RuntimeError(f"{len(failed)} shards failed after {retries + 1} attempts ({details}).")
+	return "".join(outputs[shard] for shard in range(shards))
@@ -0,0 +1,192 @@
+import numpy as np
+
+'''Registry of asset path models for the generic Monte Carlo worker. A model turns
+a block of standard normals of shape (paths, N), or (paths, N, assets) for several
+assets, into asset prices of the same shape at the N monitoring points, using the
+dtype of the normals for its arithmetic. A model may register a prepare function
+that the controller runs once per job to add precomputed values to the params,
+and a log density of its paths with the score of chosen parameters, which lets the
+calibration controller reprice under new parameters by reweighting fixed paths.
+Multi-asset models are registered as such, so jobs pairing them with single-asset
+payoffs are refused before they reach a worker. New models are added with the
+register_model decorator. This script should be located in the /home directory of
+all SLURM computers.'''
+
+MODELS = {}
+MODEL_PREPARERS = {}
+MODEL_LOG_DENSITIES = {}
+MULTI_ASSET_MODELS = set()
+REFINABLE_MODELS = set()
+
+def register_model(name, prepare=None, log_density=None, multi_asset=False, refinable=False):
+	'''Decorator that adds a path model to MODELS under name.
+
+	name: str, name the model is selected by in a job
+	prepare: function, takes the job params and returns them with precomputed values
+		added, or None
+	log_density: function, takes the params, paths of shape (paths, N) and a list of
+		parameter names and returns the log density of every path, shape (paths,),
+		and its derivatives with respect to the named parameters, shape
+		(len(names), paths), or None
+	multi_asset: bool, True if the model simulates paths of shape (paths, N, assets)
+	refinable: bool, True if paths on finer time grids of the same Brownian motion
+		converge to one process, which multilevel Monte Carlo needs. Models with
+		per-step parameters that do not scale with the time step are not'''
+	def register(model):
+		MODELS[name] = model
+		if multi_asset:
+			MULTI_ASSET_MODELS.add(name)
+		if refinable:
+			REFINABLE_MODELS.add(name)
+		if prepare is not None:
+			MODEL_PREPARERS[name] = prepare
+		if log_density is not None:
+			MODEL_LOG_DENSITIES[name] = log_density
+		return model
+	return register
+
+def path_log_returns(params, paths):
+	'''Returns the log returns between consecutive monitoring points, starting from S.
+
+	params: dict, model params with the initial stock price S
+	paths: np.ndarray, asset prices of shape (paths, N)'''
+	log_paths = np.log(np.asarray(paths, dtype=np.float64))
+	return np.diff(log_paths, axis=1, prepend=np.log(params["S"]))
+
+def gbm_log_density(params, paths, names):
+	'''Log density of geometric Brownian motion paths and its score, see register_model.
+	Only sigma can be named.'''
+	x = path_log_returns(params, paths)
+	dt = params["T"] / x.shape[1]
+	sigma = params["sigma"]
+	e = x - (params["r"] - params["q"] - 0.5 * sigma**2) * dt
+	log_density = (-0.5 * np.log(2 * np.pi * sigma**2 * dt) - 0.5 * e * e / (sigma**2 * dt)).sum(axis=1)
+	score = np.zeros((len(names), x.shape[0]))
+	for index, name in enumerate(names):
+		if name != "sigma":
+			raise ValueError(f"The gbm log density has no score for {name}.")
+		score[index] = (-1 / sigma - e / sigma + e * e / (sigma**3 * dt)).sum(axis=1)
+	return log_density, score
+
+@register_model("gbm", log_density=gbm_log_density, refinable=True)
+def gbm_paths(params, normals):
+	'''Geometric Brownian motion paths.
+
+	params: dict, S initial stock price, r risk-free interest rate, q dividend yield,
+		sigma volatility and T time to maturity
+	normals: np.ndarray, standard normals of shape (paths, N)'''
+	dtype = normals.dtype.type
+	N = normals.shape[1]
+	dt = dtype(params["T"] / N)
+	nudt = dtype((params["r"] - params["q"] - 0.5 * params["sigma"]**2) * dt)
+	sigsdt = dtype(params["sigma"] * np.sqrt(dt))
+	log_paths = np.log(dtype(params["S"])) + np.cumsum(nudt + sigsdt * normals, axis=1)
+	return np.exp(log_paths)
+
+def garch_log_density(params, paths, names):
+	'''Log density of GARCH(1,1) paths and its score, see register_model. The variance
+	is rebuilt from the log returns with the garch_paths recursion, and its derivatives
+	with respect to kappa, theta, lambda_ and the initial sigma are carried along.'''
+	x = path_log_returns(params, paths)
+	paths_count, N = x.shape
+	dt = params["T"] / N
+	kappa, theta, lambda_ = params["kappa"], params["theta"], params["lambda_"]
+	a = kappa * theta
+	b = (1 - kappa) * lambda_
+	c = (1 - kappa) * (1 - lambda_)
+	# Derivatives of a, b and c with respect to each parameter
+	partials = {
+		"kappa": (theta, -lambda_, -(1 - lambda_)),
+		"theta": (kappa, 0.0, 0.0),
+		"lambda_": (0.0, 1 - kappa, -(1 - kappa)),
+		"sigma": (0.0, 0.0, 0.0),
+	}
+	for name in names:
+		if name not in partials:
+			raise ValueError(f"The garch log density has no score for {name}.")
+	da, db, dc = (np.array([partials[name][i] for name in names]).reshape(-1, 1) for i in range(3))
+	drift = params["r"] - params["q"]
+	v = np.full(paths_count, params["sigma"]**2)
+	dv = np.outer([2 * params["sigma"] if name == "sigma" else 0.0 for name in names], np.ones(paths_count))
+	log_density = np.zeros(paths_count)
+	score = np.zeros((len(names), paths_count))
+	for j in range(N):
+		e = x[:, j] - (drift - 0.5 * v) * dt
+		log_density += -0.5 * np.log(2 * np.pi * v * dt) - 0.5 * e * e / (v * dt)
+		score += (-0.5 / v - 0.5 * e / v + 0.5 * e * e / (v * v * dt)) * dv
+		y = e / np.sqrt(dt)
+		dy = 0.5 * np.sqrt(dt) * dv
+		dv = da + db * y * y + 2 * b * y * dy + dc * v + c * dv
+		v = a + b * y * y + c * v
+	return log_density, score
+
+@register_model("garch", log_density=garch_log_density)
+def garch_paths(params, normals):
+	'''GARCH(1,1) paths with time-varying volatility.
+
+	params: dict, S initial stock price, r risk-free interest rate, q dividend yield,
+		sigma initial volatility, T time to maturity, kappa, theta and lambda_
+		GARCH parameters
+	normals: np.ndarray, standard normals of shape (paths, N)'''
+	dtype = normals.dtype.type
+	paths_count, N = normals.shape
+	dt = dtype(params["T"] / N)
+	sqrdt = np.sqrt(dt)
+	a = dtype(params["kappa"] * params["theta"])
+	b = dtype((1 - params["kappa"]) * params["lambda_"])
+	c = dtype((1 - params["kappa"]) * (1 - params["lambda_"]))
+	drift = dtype(params["r"] - params["q"])
+	log_s = np.full(paths_count, np.log(params["S"]), dtype=dtype)
+	sigma = np.full(paths_count, params["sigma"], dtype=dtype)
+	paths = np.empty_like(normals)
+	for j in range(N):
+		y = sigma * normals[:, j]
+		log_s += (drift - dtype(0.5) * sigma * sigma) * dt + sqrdt * y
+		sigma = np.sqrt(a + b * y * y + c * sigma * sigma)
+		paths[:, j] = np.exp(log_s)
+	return paths
+
+def prepare_multi_gbm(params):
+	'''Validates the per-asset params and the correlation matrix and adds its Cholesky
+	factor to the params, so it is computed once per job instead of once per worker.
+
+	params: dict, multi_gbm params with an assets x assets correlation matrix'''
+	correlation = np.asarray(params["correlation"], dtype=float)
+	assets = len(params["S"])
+	for name in ("sigma", "q"):
+		if np.ndim(params[name]) != 0 and len(params[name]) != assets:
+			raise ValueError(f"{name} must be a number or a list of {assets} values, one per asset, got {len(params[name])}.")
+	if correlation.shape != (assets, assets) or not np.allclose(correlation, correlation.T):
+		raise ValueError(f"The correlation matrix must be symmetric with shape ({assets}, {assets}).")
+	if not np.allclose(np.diag(correlation), 1):
+		# A covariance matrix would pass the Cholesky factorization and silently rescale the volatilities
+		raise ValueError("The correlation matrix must have a unit diagonal, pass volatilities in sigma.")
+	try:
+		cholesky = np.linalg.cholesky(correlation)
+	except np.linalg.LinAlgError:
+		raise ValueError("The correlation matrix must be positive definite.")
+	return dict(params, cholesky=cholesky.tolist())
+
+@register_model("multi_gbm", prepare=prepare_multi_gbm, multi_asset=True, refinable=True)
+def multi_gbm_paths(params, normals):
+	'''Correlated geometric Brownian motion paths for several assets. Independent
+	normals are correlated with the Cholesky factor in one batched matrix multiply.
+
+	params: dict, S list of initial stock prices, sigma list of volatilities, q list
+		of dividend yields, r risk-free interest rate, T time to maturity and
+		cholesky factor of the correlation matrix from prepare_multi_gbm
+	normals: np.ndarray, standard normals of shape (paths, N, assets)'''
+	dtype = normals.dtype.type
+	if normals.ndim == 2:
+		normals = normals[..., np.newaxis]
+	N = normals.shape[1]
+	dt = params["T"] / N
+	S = np.asarray(params["S"], dtype=dtype)
+	sigma = np.asarray(params["sigma"], dtype=dtype)
+	q = np.asarray(params["q"], dtype=dtype)
+	cholesky = np.asarray(params["cholesky"], dtype=dtype)
+	nudt = ((params["r"] - q - 0.5 * sigma * sigma) * dt).astype(dtype)
+	sigsdt = (sigma * np.sqrt(dt)).astype(dtype)
+	correlated = normals @ cholesky.T
+	log_paths = np.log(S) + np.cumsum(nudt + sigsdt * correlated, axis=1)
+	return np.exp(log_paths)
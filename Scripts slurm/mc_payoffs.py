@@ -0,0 +1,98 @@
+import numpy as np
+
+'''Registry of option payoffs for the generic Monte Carlo worker. A payoff maps a
+block of simulated asset prices of shape (paths, N), or (paths, N, assets) for the
+multi-asset payoffs, to undiscounted payoffs of shape (paths,). A payoff may
+register a control variate, an analytic price that the controller adds to the
+discounted Monte Carlo mean. Multi-asset payoffs register the minimum number of
+assets they need. New payoffs are added with the register_payoff decorator. This
+script should be located in the /home directory of all SLURM computers.'''
+
+PAYOFFS = {}
+CONTROL_VARIATES = {}
+MULTI_ASSET_PAYOFFS = {}
+PAYOFF_PARAMS = {}
+
+def register_payoff(name, control_variate=None, min_assets=None, params=()):
+	'''Decorator that adds a payoff to PAYOFFS under name.
+
+	name: str, name the payoff is selected by in a job
+	control_variate: function, takes the job params and N and returns the analytic
+		part of the price, or None
+	min_assets: int, minimum number of assets of a multi-asset payoff, which takes
+		paths of shape (paths, N, assets), or None for a single-asset payoff
+	params: tuple, names of the params the payoff needs, e.g. K and H, checked
+		before a job is built'''
+	def register(payoff):
+		PAYOFFS[name] = payoff
+		PAYOFF_PARAMS[name] = tuple(params)
+		if control_variate is not None:
+			CONTROL_VARIATES[name] = control_variate
+		if min_assets is not None:
+			MULTI_ASSET_PAYOFFS[name] = min_assets
+		return payoff
+	return register
+
+def geometric_asian_control_variate(params, N):
+	'''Analytic geometric Asian call price under geometric Brownian motion.
+
+	params: dict, S, K, sigma, r, q and T of the option
+	N: int, number of monitoring points'''
+	from black_scholes import geometric_asian_call
+	return geometric_asian_call(params["S"], params["K"], params["sigma"], params["r"], params["q"], params["T"], N)
+
+@register_payoff("vanilla_call", params=("K",))
+def vanilla_call(paths, params):
+	'''European call, max(S_T - K, 0).'''
+	return np.maximum(paths[:, -1] - params["K"], 0)
+
+@register_payoff("vanilla_put", params=("K",))
+def vanilla_put(paths, params):
+	'''European put, max(K - S_T, 0).'''
+	return np.maximum(params["K"] - paths[:, -1], 0)
+
+@register_payoff("digital_call", params=("K",))
+def digital_call(paths, params):
+	'''Cash-or-nothing call paying 1 if S_T > K.'''
+	return (paths[:, -1] > params["K"]).astype(paths.dtype)
+
+@register_payoff("down_and_out_call", params=("K", "H"))
+def down_and_out_call(paths, params):
+	'''European call knocked out if any monitored price is at or below the barrier H.'''
+	alive = paths.min(axis=1) > params["H"]
+	return np.where(alive, np.maximum(paths[:, -1] - params["K"], 0), 0)
+
+@register_payoff("asian_call", params=("K",))
+def asian_call(paths, params):
+	'''Arithmetic average price call, max(A - K, 0).'''
+	return np.maximum(paths.mean(axis=1) - params["K"], 0)
+
+@register_payoff("asian_call_control_variate", control_variate=geometric_asian_control_variate, params=("K",))
+def asian_call_control_variate(paths, params):
+	'''Arithmetic average price call minus the geometric average price call. Only
+	valid with the gbm model, which the geometric closed form assumes.'''
+	A = paths.mean(axis=1)
+	G = np.exp(np.log(paths).mean(axis=1))
+	return np.maximum(A - params["K"], 0) - np.maximum(G - params["K"], 0)
+
+@register_payoff("lookback_call", params=("S",))
+def lookback_call(paths, params):
+	'''Floating strike lookback call, S_T minus the minimum of S and the monitored prices.'''
+	return paths[:, -1] - np.minimum(paths.min(axis=1), params["S"])
+
+@register_payoff("basket_call", min_assets=1, params=("K",))
+def basket_call(paths, params):
+	'''Call on a weighted basket of assets, max(sum w_i S_i,T - K, 0). Weights default to equal.'''
+	assets = paths.shape[-1]
+	weights = np.asarray(params.get("weights", [1 / assets] * assets), dtype=paths.dtype)
+	return np.maximum(paths[:, -1, :] @ weights - params["K"], 0)
+
+@register_payoff("spread_call", min_assets=2, params=("K",))
+def spread_call(paths, params):
+	'''Call on the spread of the first two assets, max(S_1,T - S_2,T - K, 0).'''
+	return np.maximum(paths[:, -1, 0] - paths[:, -1, 1] - params["K"], 0)
+
+@register_payoff("best_of_call", min_assets=1, params=("K",))
+def best_of_call(paths, params):
+	'''Call on the best performing asset, max(max_i S_i,T - K, 0).'''
+	return np.maximum(paths[:, -1, :].max(axis=1) - params["K"], 0)
@@ -0,0 +1,147 @@
+import json
+import os
+import resource
+import socket
+import tracemalloc
+import numpy as np
+from time import perf_counter, process_time
+from mc_statistics import PROFILE_PREFIX
+
+'''Opt-in profiling of Monte Carlo workers. A profiled worker times the random number
+generation and the arithmetic of every block separately, tracks the bytes each block
+allocates with tracemalloc, and reports its throughput and peak resident memory as one
+JSON line of its output. The controller gathers the lines of all workers into an
+efficiency summary that flags nodes whose throughput deviates from the median, for
+sizing block lengths and node counts from measured data. This script should be
+located in the /home directory of all SLURM computers.'''
+
+class BlockProfiler:
+	'''Collects the per-block timings and allocations of one worker. Created when the
+	worker starts, so the totals cover the whole run after start-up.'''
+
+	def __init__(self):
+		tracemalloc.start()
+		self.blocks = []
+		self.wall_start = perf_counter()
+		self.cpu_start = process_time()
+
+	def start_block(self):
+		'''Marks the start of a block, before its random numbers are drawn.'''
+		tracemalloc.reset_peak()
+		self.block_baseline = tracemalloc.get_traced_memory()[0]
+		self.block_start = perf_counter()
+
+	def rng_done(self):
+		'''Marks the end of the random number generation of the current block.'''
+		self.rng_end = perf_counter()
+
+	def end_block(self, block_index, count):
+		'''Marks the end of the arithmetic of the current block and records it.
+
+		block_index: int, global index of the block
+		count: int, number of paths in the block'''
+		end = perf_counter()
+		peak = tracemalloc.get_traced_memory()[1]
+		self.blocks.append({
+			"block": block_index,
+			"paths": count,
+			"rng_seconds": self.rng_end - self.block_start,
+			"arithmetic_seconds": end - self.rng_end,
+			"peak_bytes": peak - self.block_baseline,
+		})
+
+	def summary(self, worker_id):
+		'''Stops tracing and returns the profile of the worker.
+
+		worker_id: int, index of this worker within the SLURM job'''
+		wall_seconds = perf_counter() - self.wall_start
+		cpu_seconds = process_time() - self.cpu_start
+		tracemalloc.stop()
+		paths = sum(block["paths"] for block in self.blocks)
+		rng_seconds = sum(block["rng_seconds"] for block in self.blocks)
+		arithmetic_seconds = sum(block["arithmetic_seconds"] for block in self.blocks)
+		return {
+			"worker": worker_id,
+			"node": os.environ.get("SLURMD_NODENAME", socket.gethostname()),
+			"paths": paths,
+			"wall_seconds": wall_seconds,
+			"cpu_seconds": cpu_seconds,
+			# CPU time rather than wall time, so multithreaded NumPy kernels count every core
+			"paths_per_second_per_core": paths / cpu_seconds if cpu_seconds > 0 else 0.0,
+			"rng_fraction": rng_seconds / (rng_seconds + arithmetic_seconds) if self.blocks else 0.0,
+			# ru_maxrss is in kilobytes on Linux
+			"peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+			"blocks": self.blocks,
+		}
+
+def format_profile(profile):
+	'''Formats a worker profile as a line of worker output.
+
+	profile: dict, from BlockProfiler.summary'''
+	return PROFILE_PREFIX + json.dumps(profile, separators=(",", ":"))
+
+def parse_profiles(output):
+	'''Returns the worker profiles in worker output, sorted by worker.
+
+	output: str, stdout of the SLURM job'''
+	profiles = [json.loads(line[len(PROFILE_PREFIX):]) for line in output.splitlines() if line.startswith(PROFILE_PREFIX)]
+	return sorted(profiles, key=lambda profile: profile["worker"])
+
+def efficiency_summary(profiles, tolerance=0.25):
+	'''Summarizes the worker profiles of a job. Workers whose paths per second per core
+	deviate from the median by more than tolerance are flagged. Idle workers, which got
+	no blocks because there are fewer blocks than workers, are listed as idle and left
+	out of the median.
+
+	profiles: list, worker profiles from parse_profiles
+	tolerance: float, allowed relative deviation from the median throughput'''
+	if not profiles:
+		raise ValueError("The job output holds no worker profiles, was profiling enabled?")
+	busy = [profile["paths_per_second_per_core"] for profile in profiles if profile["paths"] > 0]
+	median = float(np.median(busy)) if busy else 0.0
+	workers = []
+	for profile in profiles:
+		idle = profile["paths"] == 0
+		deviation = profile["paths_per_second_per_core"] / median - 1 if median > 0 and not idle else 0.0
+		block_bytes = [block["peak_bytes"] for block in profile["blocks"]] or [0]
+		workers.append({
+			"worker": profile["worker"],
+			"node": profile["node"],
+			"paths": profile["paths"],
+			"blocks": len(profile["blocks"]),
+			"paths_per_second_per_core": profile["paths_per_second_per_core"],
+			"deviation": deviation,
+			"rng_fraction": profile["rng_fraction"],
+			"peak_rss_mb": profile["peak_rss_mb"],
+			"max_block_mb": max(block_bytes) / 2**20,
+			"idle": idle,
+			"flagged": abs(deviation) > tolerance,
+		})
+	return {
+		"median_paths_per_second_per_core": median,
+		"total_paths": sum(worker["paths"] for worker in workers),
+		"total_cpu_seconds": sum(profile["cpu_seconds"] for profile in profiles),
+		"max_peak_rss_mb": max(worker["peak_rss_mb"] for worker in workers),
+		"flagged_nodes": sorted({worker["node"] for worker in workers if worker["flagged"]}),
+		"idle_workers": [worker["worker"] for worker in workers if worker["idle"]],
+		"workers": workers,
+	}
+
+def format_efficiency_summary(summary):
+	'''Renders an efficiency summary as a table, one line per worker.
+
+	summary: dict, from efficiency_summary'''
+	lines = [f"{'worker':>6} {'node':>12} {'paths':>12} {'blocks':>6} {'paths/s/core':>13} {'deviation':>9} {'rng':>5} {'rss MB':>8} {'block MB':>8}"]
+	for worker in summary["workers"]:
+		flag = "  <- deviates from median" if worker["flagged"] else ""
+		deviation = "idle" if worker["idle"] else f"{worker['deviation']:+.1%}"
+		lines.append(f"{worker['worker']:>6} {worker['node'][-12:]:>12} {worker['paths']:>12} {worker['blocks']:>6} "
+			f"{worker['paths_per_second_per_core']:>13.0f} {deviation:>9} {worker['rng_fraction']:>5.0%} "
+			f"{worker['peak_rss_mb']:>8.1f} {worker['max_block_mb']:>8.1f}{flag}")
+	lines.append(f"Median = {summary['median_paths_per_second_per_core']:.0f} paths/s/core, total = {summary['total_paths']} paths "
+		f"in {summary['total_cpu_seconds']:.2f} CPU seconds, peak RSS = {summary['max_peak_rss_mb']:.1f} MB")
+	if summary["flagged_nodes"]:
+		lines.append(f"Flagged nodes = {', '.join(summary['flagged_nodes'])}")
+	if summary["idle_workers"]:
+		lines.append(f"Idle workers = {', '.join(map(str, summary['idle_workers']))}, fewer blocks than workers")
+	return "\n".join(lines) + "\n"
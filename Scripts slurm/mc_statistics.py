@@ -0,0 +1,104 @@
+import numpy as np
+
+'''Numerically robust Monte Carlo statistics shared by the controller and worker
+scripts. Paths are split into fixed-size blocks with their own random number
+streams. Every block is reduced to an (n, mean, M2) tuple with NumPy's pairwise
+summation, and the tuples are merged with a fixed-order tree reduction, so
+estimates do not depend on the number of workers or the order results arrive in.
+This script should be located in the /home directory of all SLURM computers.'''
+
+# Marks the worker profile lines of mc_profiling, which parse_block_stats skips
+PROFILE_PREFIX = "profile "
+
+def worker_blocks(total_simulations, block_size, workers, worker_id):
+	'''Returns the (block_index, start, count) triples a worker is responsible for.
+	Blocks are fixed by total_simulations and block_size alone and are split into
+	contiguous ranges across workers.
+
+	total_simulations: int, total number of simulations
+	block_size: int, number of simulations per block
+	workers: int, number of workers employed
+	worker_id: int, index of this worker within the SLURM job'''
+	blocks = -(-total_simulations // block_size)
+	triples = []
+	for block_index in np.array_split(np.arange(blocks), workers)[worker_id]:
+		start = int(block_index) * block_size
+		triples.append((int(block_index), start, min(block_size, total_simulations - start)))
+	return triples
+
+def block_stats(values):
+	'''Reduces samples along the last axis to an (n, mean, M2) tuple, where M2 is
+	the sum of squared deviations from the mean. Leading axes are kept, so several
+	quantities can be reduced at once.
+
+	values: np.ndarray, samples with paths along the last axis'''
+	values = np.asarray(values, dtype=np.float64)
+	n = values.shape[-1]
+	mean = values.mean(axis=-1)
+	deviations = values - mean[..., np.newaxis]
+	M2 = (deviations * deviations).sum(axis=-1)
+	return n, mean, M2
+
+def combine_stats(first, second):
+	'''Merges two (n, mean, M2) tuples with the parallel update of Chan et al.
+
+	first: tuple, (n, mean, M2) of the first group of samples
+	second: tuple, (n, mean, M2) of the second group of samples'''
+	n_a, mean_a, M2_a = first
+	n_b, mean_b, M2_b = second
+	n = n_a + n_b
+	if n_a == 0 or n_b == 0:
+		return first if n_b == 0 else second
+	delta = mean_b - mean_a
+	mean = mean_a + delta * (n_b / n)
+	M2 = M2_a + M2_b + delta * delta * (n_a * n_b / n)
+	return n, mean, M2
+
+def tree_reduce_stats(stats):
+	'''Merges a list of (n, mean, M2) tuples by combining neighbours pairwise
+	until one tuple is left. The result only depends on the order of the list.
+
+	stats: list, (n, mean, M2) tuples ordered by block index'''
+	if not stats:
+		raise ValueError("At least one (n, mean, M2) tuple is needed.")
+	stats = list(stats)
+	while len(stats) > 1:
+		merged = [combine_stats(stats[i], stats[i + 1]) for i in range(0, len(stats) - 1, 2)]
+		if len(stats) % 2:
+			merged.append(stats[-1])
+		stats = merged
+	return stats[0]
+
+def std_error(stats):
+	'''Returns the standard error of the mean of an (n, mean, M2) tuple.
+
+	stats: tuple, (n, mean, M2)'''
+	n, mean, M2 = stats
+	return np.sqrt(M2 / max(n - 1, 1) / n)
+
+def format_block_stats(block_index, stats):
+	'''Formats one block's (n, mean, M2) tuple as a line of worker output.
+
+	block_index: int, global index of the block
+	stats: tuple, (n, mean, M2) with mean and M2 of any shape'''
+	n, mean, M2 = stats
+	values = [repr(float(value)) for value in np.ravel(mean)] + [repr(float(value)) for value in np.ravel(M2)]
+	return " ".join([str(block_index), str(n)] + values)
+
+def parse_block_stats(output, shape=()):
+	'''Parses worker output lines from format_block_stats and tree-reduces them in
+	block order. Returns the merged (n, mean, M2) tuple.
+
+	output: str, stdout of the SLURM job
+	shape: tuple, shape of the mean and M2 of each block'''
+	blocks = []
+	for line in output.strip().splitlines():
+		if line.startswith(PROFILE_PREFIX):
+			# Worker profiles from mc_profiling share the output
+			continue
+		values = line.split()
+		numbers = np.array(values[2:], dtype=float)
+		half = len(numbers) // 2
+		blocks.append((int(values[0]), (int(values[1]), numbers[:half].reshape(shape), numbers[half:].reshape(shape))))
+	blocks.sort(key=lambda block: block[0])
+	return tree_reduce_stats([stats for block_index, stats in blocks])
@@ -0,0 +1,58 @@
+import os
+import py_compile
+import subprocess
+import sys
+import tempfile
+import zipapp
+
+'''Builds the worker scripts into a single zipapp of precompiled bytecode that can be
+copied to node-local disk, so worker start-up does not read and compile sources from
+/home over NFS. Workers launched through mc_launcher run from the bundle when the
+MC_WORKER_BUNDLE environment variable holds its path on the nodes. The bytecode is
+tied to the Python version the bundle was built with, which must match the nodes.
+This script should be ran in the /home directory of the SLURM controller computer.'''
+
+BUNDLE_MAIN = """import runpy
+import sys
+
+# python3 mc_worker.pyz <module> <args>, runs <module>.py as if it were the script
+module = sys.argv[1]
+sys.argv = [module + ".py"] + sys.argv[2:]
+runpy.run_module(module, run_name="__main__", alter_sys=True)
+"""
+
+def build_worker_bundle(source_dir, bundle_path):
+	'''Compiles every script in source_dir to bytecode and packs them into a zipapp.
+
+	source_dir: str, directory holding the flat worker scripts, e.g. /home
+	bundle_path: str, path of the .pyz file to write'''
+	with tempfile.TemporaryDirectory() as build_dir:
+		for name in sorted(os.listdir(source_dir)):
+			if name.endswith(".py") and name != "__main__.py":
+				source = os.path.join(source_dir, name)
+				py_compile.compile(source, cfile=os.path.join(build_dir, name + "c"), doraise=True,
+					optimize=1, invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+		with open(os.path.join(build_dir, "__main__.py"), "w") as main_file:
+			main_file.write(BUNDLE_MAIN)
+		zipapp.create_archive(build_dir, bundle_path)
+	return bundle_path
+
+def deploy_worker_bundle(bundle_path, workers, target_dir="/tmp"):
+	'''Copies the bundle to node-local disk on every worker node. Returns the path to
+	set as MC_WORKER_BUNDLE.
+
+	bundle_path: str, bundle on shared storage
+	workers: int, number of worker nodes
+	target_dir: str, node-local directory to copy the bundle to'''
+	target = os.path.join(target_dir, os.path.basename(bundle_path))
+	subprocess.run(['srun', f"-N{workers}", 'cp', bundle_path, target], check=True)
+	return target
+
+if __name__ == "__main__":
+	# Example usage, python3 mc_worker_bundle.py /home /home/mc_worker.pyz 4
+	source_dir = sys.argv[1]
+	bundle_path = sys.argv[2]
+	workers = int(sys.argv[3])
+	build_worker_bundle(source_dir, bundle_path)
+	target = deploy_worker_bundle(bundle_path, workers)
+	print(f"export MC_WORKER_BUNDLE={target}")
@@ -0,0 +1,146 @@
+import numpy as np
+import json
+from mc_generic_controller import validate_generic_request
+from mc_launcher import launch_workers
+from mc_models import MODELS, MODEL_PREPARERS, REFINABLE_MODELS
+from mc_payoffs import PAYOFFS, CONTROL_VARIATES
+from mc_statistics import combine_stats, parse_block_stats
+
+'''Controller computer script for multilevel Monte Carlo pricing of time-stepped
+payoffs. Levels use N0 * M**level time steps, each level's coupled fine/coarse
+payoff differences are simulated across the SLURM workers, and paths are allocated
+to levels from the online variance and cost estimates so the target RMSE is met
+at close to O(epsilon^-2) cost. This script should be ran in the /home directory
+of the SLURM controller computer.'''
+
+BLOCK_SIZE = 100_000
+
+def mlmc_allocation(variances, costs, epsilon):
+	'''Returns the optimal number of paths per level for a sampling variance of
+	epsilon**2 / 2.
+
+	variances: np.ndarray, variance of the payoff difference per level
+	costs: np.ndarray, cost per path per level
+	epsilon: float, target root mean square error'''
+	return np.ceil(2 / epsilon**2 * np.sqrt(variances / costs) * np.sum(np.sqrt(variances * costs))).astype(int)
+
+def mlmc_remaining_bias(means, M, alpha=None):
+	'''Estimates the bias left after the finest level from the decay of the level
+	means, with weak order alpha estimated by regression if not given.
+
+	means: np.ndarray, mean payoff difference per level
+	M: int, refinement factor between levels
+	alpha: float, weak convergence order, or None'''
+	L = len(means) - 1
+	magnitudes = np.maximum(np.abs(means), 1e-300)
+	if alpha is None:
+		slope = np.polyfit(np.arange(1, L + 1), np.log(magnitudes[1:]), 1)[0]
+		alpha = max(0.5, -slope / np.log(M))
+	return max(magnitudes[L], magnitudes[L - 1] / M**alpha) / (M**alpha - 1)
+
+def mc_mlmc_controller(model, payoff, params, epsilon, workers, N0=1, M=2, initial_simulations=10_000, min_levels=3, max_levels=10, alpha=None, seed=None, block_size=BLOCK_SIZE, backend="srun"):
+	'''Controller computer function for multilevel Monte Carlo pricing of a registered
+	payoff under a registered path model. Returns a dict with the price, its standard
+	error and the per-level step counts, paths, means, variances and costs.
+
+	model: str, name of a model in mc_models.REFINABLE_MODELS, e.g. gbm
+	payoff: str, name of a payoff in mc_payoffs.PAYOFFS without a control variate
+	params: dict, model and payoff parameters, r and T are used for discounting
+	epsilon: float, target root mean square error of the price
+	workers: int, number of workers to employ
+	N0: int, number of time steps on the coarsest level
+	M: int, refinement factor between levels
+	initial_simulations: int, number of paths for a new level
+	min_levels: int, number of levels to start with, at least 3
+	max_levels: int, maximum number of levels
+	alpha: float, weak convergence order, estimated from the level means if None
+	seed: int, root seed of the random number streams, drawn from the OS if None
+	block_size: int, number of simulations per block
+	backend: str, srun or local, see mc_launcher.launch_workers'''
+	if model not in MODELS:
+		raise ValueError(f"Unknown model {model}, expected one of {tuple(MODELS)}.")
+	if payoff not in PAYOFFS or payoff in CONTROL_VARIATES:
+		raise ValueError(f"Unknown payoff {payoff} or payoff with a control variate.")
+	validate_generic_request(model, payoff, params)
+	if model not in REFINABLE_MODELS:
+		# The GARCH recursion is per step, so its fine and coarse levels are different processes
+		raise ValueError(f"Model {model} has no consistent time-step refinement, expected one of {sorted(REFINABLE_MODELS)}.")
+	if min_levels < 3:
+		raise ValueError("At least 3 levels are needed to estimate the weak convergence order.")
+	if seed is None:
+		seed = np.random.SeedSequence().entropy
+	if model in MODEL_PREPARERS:
+		params = MODEL_PREPARERS[model](params)
+	discount = np.exp(-params["r"] * params["T"])
+	# Work with the undiscounted payoff, so its error target is scaled up
+	epsilon = epsilon / discount
+	job = {
+		"model": model,
+		"payoff": payoff,
+		"params": params,
+		"N0": N0,
+		"M": M,
+		"assets": len(np.atleast_1d(params["S"])),
+		"block_size": block_size,
+		"workers": workers,
+		"seed": seed,
+		"pool_offset": 0,
+		"precision": "float64",
+	}
+	stats = [None] * min_levels
+	extra = [initial_simulations] * min_levels
+	stream = 0
+	while True:
+		# Simulate the extra paths of every level in one SLURM job, each on a fresh stream
+		levels = []
+		for level in range(len(extra)):
+			if extra[level] > 0:
+				levels.append([level, int(extra[level]), stream])
+				stream += 1
+		if levels:
+			output = launch_workers("mc_mlmc_worker.py", [json.dumps(dict(job, levels=levels), separators=(",", ":"))], workers, backend)
+			lines = {}
+			for line in output.strip().splitlines():
+				level, block_line = line.split(" ", 1)
+				lines.setdefault(int(level), []).append(block_line)
+			for level in lines:
+				level_stats = parse_block_stats("\n".join(lines[level]), shape=(2,))
+				stats[level] = level_stats if stats[level] is None else combine_stats(stats[level], level_stats)
+		n = np.array([level_stats[0] for level_stats in stats])
+		means = np.array([level_stats[1][0] for level_stats in stats])
+		variances = np.array([level_stats[2][0] / max(level_stats[0] - 1, 1) for level_stats in stats])
+		costs = np.maximum([level_stats[1][1] for level_stats in stats], 1e-12)
+		# Allocate paths per level optimally and top up levels that are short
+		extra = np.maximum(mlmc_allocation(variances, costs, epsilon) - n, 0)
+		if np.any(extra > 0.01 * n):
+			continue
+		# Add a finer level until the remaining bias is below epsilon / sqrt(2)
+		if mlmc_remaining_bias(means, M, alpha) <= epsilon / np.sqrt(2):
+			break
+		if len(stats) == max_levels:
+			print(f"Maximum of {max_levels} levels reached before the bias target was met.")
+			break
+		stats.append(None)
+		extra = list(np.zeros(len(stats) - 1, dtype=int)) + [initial_simulations]
+	return {
+		"price": float(discount * np.sum(means)),
+		"std_error": float(discount * np.sqrt(np.sum(variances / n))),
+		"steps": [N0 * M**level for level in range(len(stats))],
+		"n": n.tolist(),
+		"means": means.tolist(),
+		"variances": variances.tolist(),
+		"costs": costs.tolist(),
+	}
+
+if __name__ == "__main__":
+	# Example usage
+	model = "gbm"
+	payoff = "asian_call"
+	params = {"S": 100, "K": 100, "r": 0.05, "sigma": 0.2, "q": 0.01, "T": 1}
+	epsilon = 0.01
+	workers = 1
+	result = mc_mlmc_controller(model, payoff, params, epsilon, workers)
+	print(f"Workers = {workers}")
+	print(f"Price = {result['price']} +/- {result['std_error']}")
+	for level in range(len(result["steps"])):
+		print(f"level {level}, steps = {result['steps'][level]}, paths = {result['n'][level]}, variance = {result['variances'][level]}")
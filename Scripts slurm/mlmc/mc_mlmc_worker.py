@@ -0,0 +1,58 @@
+import numpy as np
+import json
+import os
+import sys
+from time import time
+from mc_generic_worker import block_normals
+from mc_models import MODELS
+from mc_payoffs import PAYOFFS
+from mc_statistics import worker_blocks, block_stats, format_block_stats
+
+'''Worker computer script for multilevel Monte Carlo. For every requested level the
+worker simulates coupled fine and coarse paths from the same Brownian increments
+and returns the statistics of the payoff difference together with the measured
+cost per path. This script should be located in the /home directory of all SLURM
+worker computers, next to the generic worker and its modules.'''
+
+def coarse_normals(normals, M):
+	'''Sums groups of M fine Brownian increments into the coarse increments, rescaled
+	to standard normals.
+
+	normals: np.ndarray, fine standard normals of shape (paths, N, ...)
+	M: int, refinement factor between levels'''
+	count, N = normals.shape[:2]
+	grouped = normals.reshape((count, N // M, M) + normals.shape[2:])
+	return grouped.sum(axis=2) / np.sqrt(M)
+
+def mc_mlmc_worker(job, worker_id):
+	'''Worker computer function for multilevel Monte Carlo. Returns a list of
+	(level, block_index, (n, mean, M2)) where mean and M2 hold the payoff difference
+	between the fine and coarse paths and the compute time per path in seconds.
+
+	job: dict, job description built by mc_mlmc_controller, with a list of
+		[level, simulations, stream] entries
+	worker_id: int, index of this worker within the SLURM job'''
+	model = MODELS[job["model"]]
+	payoff = PAYOFFS[job["payoff"]]
+	params = job["params"]
+	M = job["M"]
+	results = []
+	for level, simulations, stream in job["levels"]:
+		level_job = dict(job, N=job["N0"] * M**level, stream=stream)
+		for block_index, start, count in worker_blocks(simulations, job["block_size"], job["workers"], worker_id):
+			start_time = time()
+			normals = block_normals(level_job, block_index, start, count)
+			difference = payoff(model(params, normals), params).astype(np.float64)
+			if level > 0:
+				difference -= payoff(model(params, coarse_normals(normals, M)), params)
+			cost = np.full(count, (time() - start_time) / count)
+			results.append((level, block_index, block_stats(np.stack([difference, cost]))))
+	return results
+
+if __name__ == "__main__":
+	# Collect the JSON job description from SLURM job command
+	job = json.loads(sys.argv[1])
+	worker_id = int(os.environ.get("SLURM_PROCID", 0))
+	# Return per-level, per-block statistics to controller computer
+	for level, block_index, stats in mc_mlmc_worker(job, worker_id):
+		print(level, format_block_stats(block_index, stats))
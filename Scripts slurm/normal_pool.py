@@ -0,0 +1,67 @@
+import numpy as np
+import os
+import sys
+
+'''Shared pool of standard normal random numbers stored as a memory-mapped .npy
+file in node-local scratch. The pool is generated once per node and mapped
+zero-copy by every worker process on that node, so repeated pricing runs skip
+random number generation and bumped runs line up path-for-path. This script
+should be located in the /home directory of all SLURM worker computers.'''
+
+POOL_BLOCK = 1_000_000
+
+def normal_pool_path(seed, pool_size, scratch_dir=None):
+	'''Returns the location of the normal pool file for a seed and size.
+
+	seed: int, seed the pool is generated from
+	pool_size: int, number of standard normals in the pool
+	scratch_dir: str, node-local directory, defaults to $SLURM_TMPDIR, $TMPDIR or /tmp'''
+	if scratch_dir is None:
+		scratch_dir = os.environ.get("SLURM_TMPDIR") or os.environ.get("TMPDIR") or "/tmp"
+	return os.path.join(scratch_dir, f"normal_pool_{seed}_{pool_size}.npy")
+
+def create_normal_pool(path, seed, pool_size):
+	'''Generates a pool of standard normals block by block into a .npy file. The
+	pool is written to a temporary file and renamed into place, so concurrent
+	workers on the same node never map a partially written pool.
+
+	path: str, destination of the pool file
+	seed: int, seed the pool is generated from
+	pool_size: int, number of standard normals in the pool'''
+	rng = np.random.default_rng(np.random.SeedSequence(seed))
+	tmp_path = f"{path}.{os.getpid()}.tmp"
+	pool = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float64, shape=(pool_size,))
+	for start in range(0, pool_size, POOL_BLOCK):
+		stop = min(start + POOL_BLOCK, pool_size)
+		rng.standard_normal(stop - start, out=pool[start:stop])
+	pool.flush()
+	del pool
+	os.replace(tmp_path, path)
+
+def load_normal_pool(seed, pool_size, scratch_dir=None):
+	'''Maps the normal pool for a seed and size read-only, generating it first if
+	this node does not have it yet.
+
+	seed: int, seed the pool is generated from
+	pool_size: int, number of standard normals in the pool
+	scratch_dir: str, node-local directory, see normal_pool_path'''
+	path = normal_pool_path(seed, pool_size, scratch_dir)
+	if not os.path.exists(path):
+		create_normal_pool(path, seed, pool_size)
+	return np.load(path, mmap_mode="r")
+
+def pool_slice(pool, offset, count):
+	'''Returns a zero-copy view of count normals starting at offset.
+
+	pool: np.memmap, pool from load_normal_pool
+	offset: int, index of the first normal
+	count: int, number of normals'''
+	if offset < 0 or offset + count > len(pool):
+		raise ValueError(f"Normal pool of size {len(pool)} cannot serve {count} normals at offset {offset}.")
+	return pool[offset:offset + count]
+
+if __name__ == "__main__":
+	# Pre-generate the pool on every node, e.g. srun -N4 python3 normal_pool.py 42 100000000
+	seed = int(sys.argv[1])
+	pool_size = int(sys.argv[2])
+	print(load_normal_pool(seed, pool_size).filename)
@@ -0,0 +1,248 @@
+import json
+import queue
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from mc_generic_controller import BLOCK_SIZE, mc_generic_batch_controller, validate_generic_request
+
+'''Pricing service for many small concurrent pricing requests. Requests are posted as
+JSON to http://host:port/price and queued. Requests arriving within a short window on
+the same model, underlying parameters, monitoring points, path count and precision are
+coalesced into one batched cluster job that prices every distinct product on the same
+paths, and identical requests share one result. Requests are checked against the model
+and payoff registries before they are queued, and if a batched job still fails, its
+products are priced one by one so a single bad product only fails its own requests.
+The local backend runs the service on a single computer for testing. This script
+should be ran in the /home directory of the SLURM controller computer.
+
+Example request body:
+{"model": "gbm", "params": {"S": 100, "r": 0.05, "sigma": 0.2, "q": 0.01, "T": 1},
+ "payoff": "vanilla_call", "payoff_params": {"K": 105}, "N": 1, "total_simulations": 1000000}'''
+
+def parse_request(body):
+	'''Validates a decoded request body and fills in the defaults. Raises ValueError
+	for requests that cannot be priced, so they never join a batch.
+
+	body: dict, decoded JSON request'''
+	if not isinstance(body, dict):
+		raise ValueError("Request body must be a JSON object.")
+	for field in ("model", "params", "payoff", "total_simulations"):
+		if field not in body:
+			raise ValueError(f"Missing request field {field}.")
+	request = {
+		"model": body["model"],
+		"params": dict(body["params"]),
+		"payoff": body["payoff"],
+		"payoff_params": dict(body.get("payoff_params", {})),
+		"N": int(body.get("N", 1)),
+		"total_simulations": int(body["total_simulations"]),
+		"precision": body.get("precision", "float64"),
+	}
+	validate_generic_request(request["model"], request["payoff"], dict(request["params"], **request["payoff_params"]))
+	if request["total_simulations"] < 1 or request["N"] < 1:
+		raise ValueError("total_simulations and N must be positive.")
+	for field in ("r", "T"):
+		if field not in request["params"]:
+			raise ValueError(f"Missing model parameter {field}, used for discounting.")
+	return request
+
+def coalescing_key(request):
+	'''Returns the key of the batch a request can join. Requests with equal keys are
+	priced on the same simulated paths.
+
+	request: dict, request from parse_request'''
+	return json.dumps([request["model"], request["params"], request["N"], request["total_simulations"], request["precision"]], sort_keys=True)
+
+def product_key(request):
+	'''Returns the key of the product a request prices within its batch, identical
+	requests share it.
+
+	request: dict, request from parse_request'''
+	return json.dumps([request["payoff"], request["payoff_params"]], sort_keys=True)
+
+def job_error(error):
+	'''Returns the error to answer the requests of a failed cluster job with, the last
+	line of the worker's stderr rather than the whole worker command line.
+
+	error: Exception, raised by mc_generic_batch_controller'''
+	if isinstance(error, subprocess.CalledProcessError) and error.stderr and error.stderr.strip():
+		return RuntimeError(f"Pricing job failed: {error.stderr.strip().splitlines()[-1]}")
+	return error
+
+class PricingBatcher:
+	'''Queues pricing requests and prices them in coalesced batches. A background
+	thread collects requests for window seconds after the first one arrives, groups
+	them by coalescing_key and runs one mc_generic_batch_controller job per group, up
+	to max_jobs groups at a time.
+
+	workers: int, number of workers employed by every batched job
+	backend: str, srun or local, see mc_launcher.launch_workers
+	window: float, seconds to wait for more requests before launching a batch
+	max_jobs: int, number of batched jobs that may run at the same time
+	block_size: int, number of simulations per block'''
+
+	def __init__(self, workers, backend="srun", window=0.05, max_jobs=4, block_size=BLOCK_SIZE):
+		self.workers = workers
+		self.backend = backend
+		self.window = window
+		self.block_size = block_size
+		self.requests = queue.Queue()
+		self.executor = ThreadPoolExecutor(max_jobs)
+		self.thread = threading.Thread(target=self.run, daemon=True)
+		self.thread.start()
+
+	def submit(self, request):
+		'''Queues a request and returns a Future of its pricing result.
+
+		request: dict, request from parse_request'''
+		future = Future()
+		self.requests.put((request, future))
+		return future
+
+	def close(self):
+		'''Prices the requests already queued and stops the background thread.'''
+		self.requests.put(None)
+		self.thread.join()
+		self.executor.shutdown()
+
+	def run(self):
+		'''Collects requests into windows and hands every coalesced group to the executor.'''
+		closing = False
+		while not closing:
+			item = self.requests.get()
+			if item is None:
+				break
+			pending = [item]
+			deadline = time() + self.window
+			while True:
+				try:
+					item = self.requests.get(timeout=max(deadline - time(), 0))
+				except queue.Empty:
+					break
+				if item is None:
+					closing = True
+					break
+				pending.append(item)
+			groups = {}
+			for request, future in pending:
+				groups.setdefault(coalescing_key(request), []).append((request, future))
+			for group in groups.values():
+				self.executor.submit(self.price_group, group)
+
+	def price_group(self, group):
+		'''Prices a group of requests with one batched cluster job and fans the results out.
+		If the job fails, every product is priced on its own, so only the requests of the
+		failing product get the error.
+
+		group: list, (request, future) pairs sharing a coalescing_key'''
+		products = {}
+		for request, _ in group:
+			products.setdefault(product_key(request), [request["payoff"], request["payoff_params"]])
+		first = group[0][0]
+		try:
+			results = mc_generic_batch_controller(first["model"], first["params"], list(products.values()), first["N"],
+				first["total_simulations"], self.workers, precision=first["precision"], block_size=self.block_size, backend=self.backend)
+		except Exception as error:
+			if len(products) > 1:
+				for key in products:
+					self.price_group([(request, future) for request, future in group if product_key(request) == key])
+				return
+			for _, future in group:
+				future.set_exception(job_error(error))
+			return
+		results = dict(zip(products, results))
+		for request, future in group:
+			result = results[product_key(request)]
+			future.set_result({
+				"price": result["price"],
+				"std_error": result["std_error"],
+				"n": int(result["n"]),
+				"seed": result["job"]["seed"],
+				"batch_requests": len(group),
+				"batch_products": len(products),
+			})
+
+class PricingServer(ThreadingHTTPServer):
+	'''HTTP server answering every connection in its own thread. The listen backlog
+	is raised so bursts of concurrent clients are not refused.'''
+	daemon_threads = True
+	request_queue_size = 256
+
+class PricingRequestHandler(BaseHTTPRequestHandler):
+	'''Answers POST /price with the JSON pricing result of the request body.'''
+
+	def do_POST(self):
+		if self.path != "/price":
+			self.send_json(404, {"error": f"Unknown path {self.path}, expected /price."})
+			return
+		try:
+			length = int(self.headers.get("Content-Length", 0))
+			request = parse_request(json.loads(self.rfile.read(length)))
+		except (ValueError, TypeError) as error:
+			self.send_json(400, {"error": str(error)})
+			return
+		try:
+			result = self.server.batcher.submit(request).result()
+		except Exception as error:
+			self.send_json(500, {"error": str(error)})
+			return
+		self.send_json(200, result)
+
+	def send_json(self, status, body):
+		'''Sends a JSON response.
+
+		status: int, HTTP status code
+		body: dict, response body'''
+		data = json.dumps(body).encode()
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+	def log_message(self, format, *args):
+		# One log line per request would dominate under many small requests
+		pass
+
+def start_pricing_service(host, port, workers, backend="srun", window=0.05, max_jobs=4, block_size=BLOCK_SIZE):
+	'''Starts the pricing service in a background thread and returns the server.
+	Call server.shutdown() and server.batcher.close() to stop it.
+
+	host: str, address to listen on, e.g. 127.0.0.1
+	port: int, port to listen on, 0 picks a free port, see server.server_address
+	Other arguments are as for PricingBatcher.'''
+	server = PricingServer((host, port), PricingRequestHandler)
+	server.batcher = PricingBatcher(workers, backend, window, max_jobs, block_size)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
+
+def price(url, request):
+	'''Client helper, posts a pricing request to the service and returns its result.
+	Raises ValueError with the service's message if the request is refused.
+
+	url: str, service address, e.g. http://127.0.0.1:8642
+	request: dict, request body, see the module docstring'''
+	data = json.dumps(request).encode()
+	try:
+		with urlopen(Request(f"{url}/price", data=data, headers={"Content-Type": "application/json"})) as response:
+			return json.load(response)
+	except HTTPError as error:
+		raise ValueError(json.load(error)["error"]) from error
+
+if __name__ == "__main__":
+	# Example usage, python3 mc_pricing_service.py 127.0.0.1 8642 4 srun
+	host = sys.argv[1]
+	port = int(sys.argv[2])
+	workers = int(sys.argv[3])
+	backend = sys.argv[4] if len(sys.argv) > 4 else "srun"
+	server = start_pricing_service(host, port, workers, backend)
+	print(f"Pricing service listening on http://{host}:{server.server_address[1]}/price")
+	try:
+		server.batcher.thread.join()
+	except KeyboardInterrupt:
+		server.shutdown()
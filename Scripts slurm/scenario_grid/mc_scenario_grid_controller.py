@@ -0,0 +1,90 @@
+import numpy as np
+import json
+from mc_generic_controller import validate_generic_request
+from mc_launcher import launch_workers
+from mc_payoffs import CONTROL_VARIATES
+from mc_statistics import parse_block_stats, std_error
+
+'''Controller computer script for pricing an option across a grid of spot, volatility,
+rate and maturity scenarios using Monte Carlo simulation. All scenarios are priced
+in a single SLURM job from shared paths. This script should be ran in the /home
+directory of the SLURM controller computer.'''
+
+BLOCK_SIZE = 100_000
+
+def mc_scenario_grid_controller(payoff, K, q, S_values, sigma_values, r_values, T_values, total_simulations, workers, H=0, N=1, seed=None, pool_size=0, precision="float64", block_size=BLOCK_SIZE, backend="srun"):
+	'''Controller computer function for pricing an option across a scenario grid using
+	Monte Carlo simulation. Returns a dict with the price and standard error cubes of shape
+	(len(S_values), len(sigma_values), len(r_values), len(T_values)) and the grid axes.
+
+	payoff: str, name of a single-asset payoff in mc_payoffs.PAYOFFS, e.g. vanilla_call,
+		down_and_out_call or asian_call_control_variate
+	K: float, strike price
+	q: float, dividend yield
+	S_values: list, initial stock prices
+	sigma_values: list, volatilities
+	r_values: list, risk-free interest rates
+	T_values: list, times to maturity
+	total_simulations: int, total number of simulations
+	workers: int, number of workers to employ
+	H: float, barrier, only used by down_and_out_call
+	N: int, number of monitoring points
+	seed: int, root seed of the random number streams, drawn from the OS if None
+	pool_size: int, size of the node-local normal pool to draw from, 0 to generate fresh normals
+	precision: str, float64 or float32 path arithmetic, see experiment/mc_precision_validation.py
+	block_size: int, number of simulations per block
+	backend: str, srun or local, see mc_launcher.launch_workers'''
+	# Scenario paths are single-asset geometric Brownian motion
+	validate_generic_request("gbm", payoff)
+	if seed is None:
+		seed = np.random.SeedSequence().entropy
+	S_values = np.asarray(S_values, dtype=float)
+	sigma_values = np.asarray(sigma_values, dtype=float)
+	r_values = np.asarray(r_values, dtype=float)
+	T_values = np.asarray(T_values, dtype=float)
+	grid_shape = (len(S_values), len(sigma_values), len(r_values), len(T_values))
+	# Build the job description passed to every worker as one JSON argument
+	job = {"payoff": payoff, "K": K, "q": q, "H": H, "N": N, "S_values": S_values.tolist(), "sigma_values": sigma_values.tolist(),
+		"r_values": r_values.tolist(), "T_values": T_values.tolist(), "total_simulations": total_simulations,
+		"block_size": block_size, "workers": workers, "seed": seed, "pool_size": pool_size, "precision": precision}
+	# Launch SLURM job and collect results
+	output = launch_workers("mc_scenario_grid_worker.py", [json.dumps(job, separators=(",", ":"))], workers, backend)
+	# Tree-reduce per-block statistics in block order
+	stats = parse_block_stats(output, shape=grid_shape)
+	n, mean_payoff, M2 = stats
+	# Discount every scenario to present time
+	r = r_values.reshape(1, 1, -1, 1)
+	T = T_values.reshape(1, 1, 1, -1)
+	discount = np.exp(-r * T)
+	price = discount * mean_payoff
+	if payoff in CONTROL_VARIATES:
+		# Add the analytic part of the price for every scenario
+		S = S_values.reshape(-1, 1, 1, 1)
+		sigma = sigma_values.reshape(1, -1, 1, 1)
+		price = price + CONTROL_VARIATES[payoff]({"S": S, "K": K, "sigma": sigma, "r": r, "q": q, "T": T, "H": H}, N)
+	return {
+		"S": S_values,
+		"sigma": sigma_values,
+		"r": r_values,
+		"T": T_values,
+		"n": n,
+		"price": price,
+		"std_error": discount * std_error(stats),
+	}
+
+if __name__ == "__main__":
+	# Example usage, OTM/ATM/ITM spots crossed with volatility and rate bumps
+	payoff = "vanilla_call"
+	K = 100
+	q = 0.01
+	S_values = [90, 100, 110]
+	sigma_values = [0.19, 0.2, 0.21]
+	r_values = [0.049, 0.05, 0.051]
+	T_values = [0.5, 1]
+	total_simulations = 1_000_000
+	workers = 1
+	result = mc_scenario_grid_controller(payoff, K, q, S_values, sigma_values, r_values, T_values, total_simulations, workers)
+	print(f"Workers = {workers}")
+	print(f"Total Simulations = {result['n']}")
+	for i in range(len(S_values)):
+		print(f"S = {S_values[i]}, sigma = {sigma_values[1]}, r = {r_values[1]}, T = {T_values[-1]}, Price = {result['price'][i, 1, 1, -1]}")
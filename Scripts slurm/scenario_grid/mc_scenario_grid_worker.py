@@ -0,0 +1,107 @@
+import numpy as np
+import json
+import os
+import sys
+from mc_payoffs import PAYOFFS
+from mc_statistics import worker_blocks, block_stats, tree_reduce_stats, format_block_stats
+
+'''Worker computer script for pricing an option across a grid of spot, volatility,
+rate and maturity scenarios with Monte Carlo simulation. One set of standard normal
+draws is simulated per worker and rescaled for every scenario, and the payoff is taken
+from the mc_payoffs registry. Paths can be stepped in float32 while payoff statistics
+are always accumulated in float64. This script should be located in the /home
+directory of all SLURM worker computers, next to mc_payoffs.py, normal_pool.py and
+mc_statistics.py.'''
+
+PRECISIONS = {"float64": np.float64, "float32": np.float32}
+BLOCK_ELEMENTS = 4_000_000
+
+def scenario_grid_payoffs(payoff, K, q, H, S_values, sigma_values, r_values, T_values, normals):
+	'''Computes the undiscounted payoffs of one block of paths for every grid scenario.
+	Returns an array of shape (len(S_values), len(sigma_values), len(r_values), len(T_values), paths).
+	The arithmetic is done in the dtype of normals, grid values should share that dtype.
+
+	payoff: str, name of a single-asset payoff in mc_payoffs.PAYOFFS
+	K: float, strike price
+	q: float, dividend yield
+	H: float, barrier, only used by down_and_out_call
+	S_values: np.ndarray, initial stock prices
+	sigma_values: np.ndarray, volatilities
+	r_values: np.ndarray, risk-free interest rates
+	T_values: np.ndarray, times to maturity
+	normals: np.ndarray, standard normals of shape (paths, N monitoring points)'''
+	N = normals.shape[1]
+	S = S_values.reshape(-1, 1, 1, 1, 1, 1)
+	sigma = sigma_values.reshape(1, -1, 1, 1, 1, 1)
+	r = r_values.reshape(1, 1, -1, 1, 1, 1)
+	T = T_values.reshape(1, 1, 1, -1, 1, 1)
+	# Brownian motion at the monitoring points, shared by every scenario
+	W = np.cumsum(normals, axis=1)
+	t_fraction = (np.arange(1, N + 1) / N).astype(normals.dtype)
+	paths = np.exp(np.log(S) + (r - q - 0.5 * sigma * sigma) * T * t_fraction + sigma * np.sqrt(T / N) * W)
+	# Every scenario's paths become rows of one (paths, N) block, with the scenario values per row
+	shape = paths.shape[:-1]
+	params = {name: np.broadcast_to(values[..., 0], shape).ravel() for name, values in (("S", S), ("sigma", sigma), ("r", r), ("T", T))}
+	params.update(K=K, q=q, H=H)
+	return PAYOFFS[payoff](paths.reshape(-1, N), params).reshape(shape)
+
+def mc_scenario_grid_worker(payoff, K, q, H, N, S_values, sigma_values, r_values, T_values, total_simulations, block_size, workers, seed, worker_id, pool_size=0, precision="float64"):
+	'''Worker computer function for pricing an option across a scenario grid using Monte
+	Carlo simulation. Returns a list of (block_index, (n, mean, M2)) pairs, one per block of
+	paths simulated on this worker, where mean and M2 have shape
+	(len(S_values), len(sigma_values), len(r_values), len(T_values)).
+
+	payoff: str, name of a single-asset payoff in mc_payoffs.PAYOFFS
+	K: float, strike price
+	q: float, dividend yield
+	H: float, barrier, only used by down_and_out_call
+	N: int, number of monitoring points
+	S_values: np.ndarray, initial stock prices
+	sigma_values: np.ndarray, volatilities
+	r_values: np.ndarray, risk-free interest rates
+	T_values: np.ndarray, times to maturity
+	total_simulations: int, total number of simulations across all workers
+	block_size: int, number of simulations per block
+	workers: int, number of workers employed
+	seed: int, root seed shared by every worker of the pricing run
+	worker_id: int, index of this worker within the SLURM job
+	pool_size: int, size of the shared normal pool to draw from, 0 to generate fresh normals
+	precision: str, float64 or float32 path arithmetic, payoff statistics are float64 either way'''
+	if payoff not in PAYOFFS:
+		raise ValueError(f"Unknown payoff {payoff}, expected one of {tuple(PAYOFFS)}.")
+	if precision not in PRECISIONS:
+		raise ValueError(f"Unknown precision {precision}, expected one of {tuple(PRECISIONS)}.")
+	dtype = PRECISIONS[precision]
+	S_values, sigma_values, r_values, T_values = [np.asarray(values, dtype=dtype) for values in (S_values, sigma_values, r_values, T_values)]
+	grid_shape = (len(S_values), len(sigma_values), len(r_values), len(T_values))
+	if pool_size:
+		# Only imported when a pool is used, to keep worker start-up lean
+		import normal_pool
+		pool = normal_pool.load_normal_pool(seed, pool_size)
+	# Size chunks so a whole grid of paths fits in a bounded amount of memory
+	chunk = max(1, BLOCK_ELEMENTS // (int(np.prod(grid_shape)) * N))
+	results = []
+	for block_index, start, count in worker_blocks(total_simulations, block_size, workers, worker_id):
+		if pool_size:
+			normals = normal_pool.pool_slice(pool, start * N, count * N)
+		else:
+			rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(0, block_index)))
+			normals = rng.standard_normal(count * N, dtype=dtype)
+		normals = normals.reshape(count, N)
+		chunk_stats = []
+		for chunk_start in range(0, count, chunk):
+			chunk_normals = normals[chunk_start:chunk_start + chunk].astype(dtype, copy=False)
+			payoffs = scenario_grid_payoffs(payoff, K, q, H, S_values, sigma_values, r_values, T_values, chunk_normals)
+			chunk_stats.append(block_stats(payoffs))
+		results.append((block_index, tree_reduce_stats(chunk_stats)))
+	return results
+
+if __name__ == "__main__":
+	# Collect the JSON job description from SLURM job command
+	job = json.loads(sys.argv[1])
+	for name in ("S_values", "sigma_values", "r_values", "T_values"):
+		job[name] = np.array(job[name], dtype=float)
+	worker_id = int(os.environ.get("SLURM_PROCID", 0))
+	# Return per-block statistics to controller computer
+	for block_index, stats in mc_scenario_grid_worker(**job, worker_id=worker_id):
+		print(format_block_stats(block_index, stats))